@@ -1,83 +1,203 @@
-import cv2
+"""
+Общий сервис камеры для всех виджетов приложения.
+
+Каждый кадр захватывается с устройства ровно один раз в отдельном потоке,
+складывается в кольцевой буфер и раздается всем подписчикам без копирования:
+через сигнал frame_ready (для отображения), через персональные очереди
+(для фоновых обработчиков) и через latest_frame() (для периодической съемки).
+Кадры помечаются как только для чтения, поэтому подписчик, которому нужно
+рисовать на кадре, должен сначала сделать копию.
+
+Сигнал frame_ready выдается не чаще DISPLAY_FPS и только когда GUI-поток
+обработал предыдущий кадр: в очереди событий Qt всегда не больше одного
+ожидающего кадра, а при нагрузке лишние кадры пропускаются.
+"""
+import sys
 import threading
-from PyQt5.QtCore import QObject, pyqtSignal, QTimer
+import time
+from collections import deque
+
+import cv2
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+
+from video_pipeline import LatestFrameQueue
+
+CAMERA_INDEX = 0
+CAMERA_BACKEND = cv2.CAP_DSHOW if sys.platform == "win32" else cv2.CAP_ANY
+RING_BUFFER_SIZE = 8
+DISPLAY_FPS = 25  # Наибольшая частота кадров для отображения (0 - без ограничения)
+
+
+class FrameRingBuffer:
+    """Кольцевой буфер последних кадров с порядковыми номерами"""
+
+    def __init__(self, capacity=RING_BUFFER_SIZE):
+        self._frames = deque(maxlen=capacity)  # (seq, timestamp, frame)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def push(self, frame):
+        """Добавляет кадр и возвращает его порядковый номер"""
+        with self._lock:
+            self._seq += 1
+            self._frames.append((self._seq, time.monotonic(), frame))
+            return self._seq
+
+    def latest(self):
+        """Возвращает (seq, frame) последнего кадра или (None, None)"""
+        with self._lock:
+            if not self._frames:
+                return None, None
+            seq, _, frame = self._frames[-1]
+            return seq, frame
+
+    def clear(self):
+        """Очищает буфер"""
+        with self._lock:
+            self._frames.clear()
+
+
+class CaptureThread(QThread):
+    """Поток, который читает кадры с устройства и передает их сервису"""
+
+    def __init__(self, cap, on_frame, parent=None):
+        super().__init__(parent)
+        self.cap = cap
+        self.on_frame = on_frame
+        self._running = False
+
+    def run(self):
+        self._running = True
+        while self._running:
+            ret, frame = self.cap.read()
+            if not ret:
+                self.msleep(10)
+                continue
+            self.on_frame(frame)
+
+    def stop(self):
+        """Останавливает поток и дожидается его завершения"""
+        self._running = False
+        self.wait()
 
 
 class CameraManager(QObject):
-    """Глобальный менеджер камеры для безопасного доступа из разных виджетов"""
+    """Глобальный менеджер камеры: один захват, много подписчиков"""
 
-    frame_ready = pyqtSignal(object)  # Сигнал с новым кадром
+    frame_ready = pyqtSignal(object)  # Сигнал с новым кадром (в GUI-потоке)
+    _frame_available = pyqtSignal()  # Внутренний: из потока захвата в GUI-поток
 
-    def __init__(self):
+    def __init__(self, device_index=CAMERA_INDEX, backend=CAMERA_BACKEND,
+                 buffer_size=RING_BUFFER_SIZE, display_fps=DISPLAY_FPS):
         super().__init__()
+        self.display_interval = 1.0 / display_fps if display_fps else 0.0
+        self._display_pending = False  # Кадр для отображения уже ждет в очереди событий
+        self._last_display = 0.0
+        self._frame_available.connect(self._deliver_frame)
+        self.device_index = device_index
+        self.backend = backend
         self.cap = None
-        self.timer = None
-        self.is_running = False
-        self.current_consumer = None  # Текущий виджет, использующий камеру
-        self.lock = threading.Lock()
-
-    def start_for_widget(self, widget_id):
-        """Запуск камеры для конкретного виджета"""
+        self.capture_thread = None
+        self.buffer = FrameRingBuffer(buffer_size)
+        self.subscribers = {}  # subscriber_id -> LatestFrameQueue
+        self.lock = threading.RLock()  # Запуск и остановка устройства
+        self._subscribers_lock = threading.Lock()  # Короткий доступ из потока захвата
+
+    @property
+    def is_running(self):
+        return self.capture_thread is not None
+
+    def subscribe(self, subscriber_id, queue_size=1):
+        """
+        Подписывает потребителя на кадры. Камера запускается с первым подписчиком.
+
+        Returns:
+            LatestFrameQueue подписчика или None, если камеру открыть не удалось
+        """
+        with self.lock:
+            if not self.start_camera():
+                return None
+
+            with self._subscribers_lock:
+                queue = self.subscribers.get(subscriber_id)
+                if queue is None:
+                    queue = LatestFrameQueue(maxsize=queue_size)
+                    self.subscribers[subscriber_id] = queue
+            return queue
+
+    def unsubscribe(self, subscriber_id):
+        """Отписывает потребителя. Камера останавливается с последним подписчиком"""
         with self.lock:
-            if self.current_consumer and self.current_consumer != widget_id:
+            with self._subscribers_lock:
+                self.subscribers.pop(subscriber_id, None)
+                has_subscribers = bool(self.subscribers)
+            if not has_subscribers:
                 self.stop_camera()
 
-            self.current_consumer = widget_id
+    def is_subscribed(self, subscriber_id):
+        """Проверяет, получает ли потребитель кадры"""
+        return self.is_running and subscriber_id in self.subscribers
 
-            if not self.is_running:
-                self.start_camera()
-
-    def stop_for_widget(self, widget_id):
-        """Остановка камеры для виджета"""
-        with self.lock:
-            if self.current_consumer == widget_id:
-                self.stop_camera()
-                self.current_consumer = None
+    def latest_frame(self):
+        """Возвращает (seq, frame) последнего кадра, не забирая его у других подписчиков"""
+        return self.buffer.latest()
 
     def start_camera(self):
-        """Запуск камеры"""
-        if self.is_running:
-            return
+        """Открывает устройство и запускает поток захвата"""
+        with self.lock:
+            if self.is_running:
+                return True
 
-        self.cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
-        if not self.cap.isOpened():
-            print("Ошибка: не удалось открыть камеру")
-            return
+            self.cap = cv2.VideoCapture(self.device_index, self.backend)
+            if not self.cap.isOpened():
+                print("Ошибка: не удалось открыть камеру")
+                self.cap = None
+                return False
 
-        self.is_running = True
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.capture_frame)
-        self.timer.start(30)  # ~30 FPS
+            self.capture_thread = CaptureThread(self.cap, self._on_frame)
+            self.capture_thread.start()
+            return True
 
     def stop_camera(self):
-        """Остановка камеры"""
-        if not self.is_running:
-            return
-
-        if self.timer:
-            self.timer.stop()
-            self.timer = None
+        """Останавливает захват и освобождает устройство"""
+        with self.lock:
+            if self.capture_thread:
+                self.capture_thread.stop()
+                self.capture_thread = None
 
-        if self.cap and self.cap.isOpened():
-            self.cap.release()
+            if self.cap and self.cap.isOpened():
+                self.cap.release()
             self.cap = None
 
-        self.is_running = False
+            with self._subscribers_lock:
+                self.subscribers.clear()
+            self.buffer.clear()
 
-    def capture_frame(self):
-        """Захват кадра и отправка сигнала"""
-        if self.cap and self.cap.isOpened():
-            ret, frame = self.cap.read()
-            if ret:
-                self.frame_ready.emit(frame)
+    def _on_frame(self, frame):
+        """Раздает захваченный кадр подписчикам (вызывается из потока захвата)"""
+        # Один и тот же массив уходит всем подписчикам, поэтому запрещаем его изменение
+        frame.flags.writeable = False
+        self.buffer.push(frame)
 
-    def get_single_frame(self):
-        """Получить один кадр (для фотографий)"""
-        if self.cap and self.cap.isOpened():
-            ret, frame = self.cap.read()
-            return frame if ret else None
-        return None
+        with self._subscribers_lock:
+            queues = list(self.subscribers.values())
+        for queue in queues:
+            queue.put(frame)
+
+        # Отображение: не чаще display_fps и без накопления кадров в очереди событий
+        now = time.monotonic()
+        if not self._display_pending and now - self._last_display >= self.display_interval:
+            self._display_pending = True
+            self._last_display = now
+            self._frame_available.emit()
+
+    def _deliver_frame(self):
+        """Выдает подписчикам самый свежий кадр (вызывается в GUI-потоке)"""
+        self._display_pending = False
+        _, frame = self.buffer.latest()
+        if frame is not None:
+            self.frame_ready.emit(frame)
 
 
 # Глобальный экземпляр менеджера
-camera_manager = CameraManager()
\ No newline at end of file
+camera_manager = CameraManager()
@@ -10,7 +10,7 @@ print("\n1. Файлы проекта:")
 files = [
     "main.py", "main_window.py", "recognition.py",
     "recognition_service.py", "database.py", "image_utils.py",
-    "face_recognition_model.yml"
+    "face_recognition_model.bin"
 ]
 
 for f in files:
@@ -21,13 +21,14 @@ for f in files:
 # 2. Попробуем импортировать
 print("\n2. Проверка импортов:")
 try:
-    from database import init_db, get_all_photos
+    from database import init_db, count_photos
     print("   database: ✓")
 except Exception as e:
     print(f"   database: ✗ ({e})")
 
 try:
     from recognition import face_recognizer
+    from model_file import verify_model
     print("   recognition: ✓")
 except Exception as e:
     print(f"   recognition: ✗ ({e})")
@@ -36,19 +37,20 @@ except Exception as e:
 print("\n3. Проверка базы данных:")
 try:
     init_db()
-    photos = get_all_photos()
-    print(f"   Фото в базе: {len(photos)}")
+    print(f"   Фото в базе: {count_photos()}")
 except Exception as e:
     print(f"   Ошибка базы: {e}")
 
 # 4. Проверка модели
 print("\n4. Проверка модели:")
-if os.path.exists("face_recognition_model.yml"):
+if os.path.exists("face_recognition_model.bin"):
     try:
         if face_recognizer.load_model():
             print(f"   Модель загружена")
             print(f"   is_trained: {face_recognizer.is_trained}")
             print(f"   Лиц в модели: {len(face_recognizer.labels)}")
+            intact, error = verify_model("face_recognition_model.bin")
+            print(f"   Гистограммы: {'✓' if intact else f'✗ ({error})'}")
         else:
             print("   Не удалось загрузить модель")
     except Exception as e:
@@ -57,7 +59,7 @@ else:
     print("   Файл модели не найден")
 
 print("\n=== РЕКОМЕНДАЦИИ ===")
-if not os.path.exists("face_recognition_model.yml"):
+if not os.path.exists("face_recognition_model.bin"):
     print("1. Запустите: python train_model.py")
 elif face_recognizer.is_trained and len(face_recognizer.labels) > 0:
     print("1. Модель готова, запускайте: python main.py")
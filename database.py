@@ -1,50 +1,311 @@
 import sqlite3
+import threading
 from datetime import datetime
 
+from photo_store import photo_store
+
 DB_NAME = "faces.db"
+PHOTO_BATCH = 64  # Сколько фото читать из базы за раз при потоковом чтении
+
+# Где хранить байты новых фото: "database" - в колонке image_data,
+# "files" - в photo_store, а в базе только хэш (см. migrate_photos.py)
+PHOTO_STORAGE = "database"
+
+# Настройки соединений: выполняются один раз при открытии соединения потока.
+# WAL позволяет читать базу во время записи (живое распознавание и обучение не блокируют друг друга)
+DB_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",  # В режиме WAL безопасно и без fsync на каждый коммит
+    "cache_size": -16000,  # Отрицательное значение - размер в КБ
+    "foreign_keys": "ON",  # Удаление человека каскадно удаляет его фото и журнал
+}
+DB_TIMEOUT = 5.0  # Сколько секунд ждать освобождения блокировки
+STATEMENT_CACHE_SIZE = 128  # Подготовленных запросов на соединение
+
+# Кэш людей: person_id -> строка persons. Заполняется целиком при первом обращении
+# и обновляется функциями add_person, update_person и delete_person
+_person_cache = None
+_person_cache_lock = threading.Lock()
+
+_local = threading.local()
+_connections = []  # Все открытые соединения, для close_connections()
+_connections_lock = threading.Lock()
+
+# Подписчики на изменения данных: callback(event, **data)
+_listeners = []
+
 
 def connect():
-    return sqlite3.connect(DB_NAME)
+    """
+    Возвращает постоянное соединение текущего потока
 
+    Соединение открывается при первом обращении из потока и переиспользуется,
+    вместе с ним переиспользуются и подготовленные запросы. Использование
+    в блоке with фиксирует или откатывает транзакцию, но не закрывает соединение.
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
 
-def init_db():
+    conn = connections.get(DB_NAME)
+    if conn is None:
+        # Соединение используется только своим потоком; закрыть его можно из любого (при выходе)
+        conn = sqlite3.connect(DB_NAME, timeout=DB_TIMEOUT, cached_statements=STATEMENT_CACHE_SIZE,
+                               check_same_thread=False)
+        for name, value in DB_PRAGMAS.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        # Встроенные LIKE и LOWER приводят к одному регистру только латиницу
+        conn.create_function("casefold", 1, _casefold, deterministic=True)
+        connections[DB_NAME] = conn
+        with _connections_lock:
+            _connections.append(conn)
+    return conn
+
+
+def _casefold(value):
+    """SQL-функция casefold: приведение к одному регистру для любого алфавита"""
+    return value.casefold() if isinstance(value, str) else value
+
+
+def close_connections():
+    """Закрывает соединения всех потоков (при выходе из приложения)"""
+    with _connections_lock:
+        connections = list(_connections)
+        _connections.clear()
+    for conn in connections:
+        try:
+            conn.close()
+        except Exception as e:
+            print(f"Ошибка закрытия соединения с базой: {e}")
+    _local.__dict__.pop("connections", None)
+
+
+def close_thread_connection():
+    """
+    Закрывает соединение текущего потока
+
+    Вызывается в конце run() короткоживущих потоков (добавление фото, загрузка
+    миниатюр, запись журнала), чтобы каждое их выполнение не оставляло открытое
+    соединение с файлами WAL и кэшем страниц до выхода из приложения.
+    """
+    connections = _local.__dict__.pop("connections", None) or {}
+    for conn in connections.values():
+        with _connections_lock:
+            if conn in _connections:
+                _connections.remove(conn)
+        try:
+            conn.close()
+        except Exception as e:
+            print(f"Ошибка закрытия соединения с базой: {e}")
+
+
+def add_listener(callback):
+    """
+    Подписывает обработчик на изменения людей и фотографий
+
+    События: person_added, person_updated (person_id, first_name, last_name),
+    person_deleted (person_id), photo_added (person_id, photo_id, image_bytes),
+    photos_added (person_id, photo_ids, images) - пакет из add_photos_bulk
+    """
+    if callback not in _listeners:
+        _listeners.append(callback)
+
+
+def _notify(event, **data):
+    for callback in list(_listeners):
+        try:
+            callback(event, **data)
+        except Exception as e:
+            print(f"Ошибка обработчика события {event}: {e}")
+
+
+def _migration_initial(cur):
+    """1: исходная схема"""
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS persons (
+        person_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        first_name TEXT NOT NULL,
+        last_name TEXT NOT NULL,
+        academic_group TEXT NOT NULL,
+        description TEXT
+    )
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS photos (
+        photo_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        person_id INTEGER NOT NULL,
+        file_name TEXT NOT NULL,
+        file_format TEXT NOT NULL,
+        file_size INTEGER NOT NULL,
+        image_data BLOB NOT NULL,
+        FOREIGN KEY (person_id) REFERENCES persons(person_id)
+    )
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS recognition_logs (
+        log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        recognition_time TEXT NOT NULL,
+        recognized_person_id INTEGER,
+        similarity_score REAL,
+        result TEXT NOT NULL,
+        FOREIGN KEY (recognized_person_id) REFERENCES persons(person_id)
+    )
+    """)
+
+
+def _migration_image_hash(cur):
+    """2: хэш фото в photo_store"""
+    columns = [row[1] for row in cur.execute("PRAGMA table_info(photos)")]
+    if "image_hash" not in columns:
+        cur.execute("ALTER TABLE photos ADD COLUMN image_hash TEXT")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_photos_image_hash ON photos(image_hash)")
+
+
+def _migration_indexes(cur):
+    """3: индексы для выборок по человеку и отчетов по журналу"""
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_photos_person_id ON photos(person_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_logs_person_id ON recognition_logs(recognized_person_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_logs_time ON recognition_logs(recognition_time)")
+
+
+def _migration_cascade(cur):
+    """4: ON DELETE CASCADE для фото и журнала, image_data может быть пустым при хранении в файлах"""
+    # Записи, оставшиеся от удаленных людей, не пройдут проверку внешних ключей
+    cur.execute("DELETE FROM photos WHERE person_id NOT IN (SELECT person_id FROM persons)")
+    cur.execute(
+        "DELETE FROM recognition_logs WHERE recognized_person_id IS NOT NULL "
+        "AND recognized_person_id NOT IN (SELECT person_id FROM persons)"
+    )
+
+    # SQLite не умеет менять внешние ключи, поэтому таблицы пересоздаются
+    cur.execute("""
+    CREATE TABLE photos_new (
+        photo_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        person_id INTEGER NOT NULL,
+        file_name TEXT NOT NULL,
+        file_format TEXT NOT NULL,
+        file_size INTEGER NOT NULL,
+        image_data BLOB,
+        image_hash TEXT,
+        FOREIGN KEY (person_id) REFERENCES persons(person_id) ON DELETE CASCADE
+    )
+    """)
+    cur.execute("""
+    INSERT INTO photos_new
+    SELECT photo_id, person_id, file_name, file_format, file_size,
+           CASE WHEN image_hash IS NULL THEN image_data END, image_hash
+    FROM photos
+    """)
+    cur.execute("DROP TABLE photos")
+    cur.execute("ALTER TABLE photos_new RENAME TO photos")
+
+    cur.execute("""
+    CREATE TABLE recognition_logs_new (
+        log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        recognition_time TEXT NOT NULL,
+        recognized_person_id INTEGER,
+        similarity_score REAL,
+        result TEXT NOT NULL,
+        FOREIGN KEY (recognized_person_id) REFERENCES persons(person_id) ON DELETE CASCADE
+    )
+    """)
+    cur.execute("INSERT INTO recognition_logs_new SELECT * FROM recognition_logs")
+    cur.execute("DROP TABLE recognition_logs")
+    cur.execute("ALTER TABLE recognition_logs_new RENAME TO recognition_logs")
+
+    # Индексы удаляются вместе со старыми таблицами
+    _migration_image_hash(cur)
+    _migration_indexes(cur)
+
+
+def _migration_person_sort_indexes(cur):
+    """5: индексы для постраничного вывода людей с сортировкой"""
+    for column in ("first_name", "last_name", "academic_group"):
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_persons_{column} ON persons({column}, person_id)")
+
+
+def _migration_thumbnails(cur):
+    """6: миниатюры фото для просмотра базы"""
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS thumbnails (
+        photo_id INTEGER PRIMARY KEY,
+        image BLOB NOT NULL,
+        FOREIGN KEY (photo_id) REFERENCES photos(photo_id) ON DELETE CASCADE
+    )
+    """)
+
+
+# Миграции схемы по порядку: (версия, функция). Новые добавляются только в конец
+MIGRATIONS = [
+    (1, _migration_initial),
+    (2, _migration_image_hash),
+    (3, _migration_indexes),
+    (4, _migration_cascade),
+    (5, _migration_person_sort_indexes),
+    (6, _migration_thumbnails),
+]
+
+
+def get_schema_version():
     with connect() as conn:
         cur = conn.cursor()
+        cur.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+        cur.execute("SELECT MAX(version) FROM schema_version")
+        return cur.fetchone()[0] or 0
 
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS persons (
-            person_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            first_name TEXT NOT NULL,
-            last_name TEXT NOT NULL,
-            academic_group TEXT NOT NULL,
-            description TEXT
-        )
-        """)
-
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS photos (
-            photo_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            person_id INTEGER NOT NULL,
-            file_name TEXT NOT NULL,
-            file_format TEXT NOT NULL,
-            file_size INTEGER NOT NULL,
-            image_data BLOB NOT NULL,
-            FOREIGN KEY (person_id) REFERENCES persons(person_id)
-        )
-        """)
-
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS recognition_logs (
-            log_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            recognition_time TEXT NOT NULL,
-            recognized_person_id INTEGER,
-            similarity_score REAL,
-            result TEXT NOT NULL,
-            FOREIGN KEY (recognized_person_id) REFERENCES persons(person_id)
-        )
-        """)
 
-        conn.commit()
+def init_db():
+    """Создает базу или обновляет схему существующей базы до последней версии"""
+    current = get_schema_version()
+    pending = [(version, migration) for version, migration in MIGRATIONS if version > current]
+    if pending:
+        _apply_migrations(pending)
+
+    # Люди загружаются в кэш при старте, дальше поиск по ID не обращается к базе
+    load_person_cache()
+
+
+def _apply_migrations(pending):
+    """Применяет миграции по порядку, каждую в своей транзакции"""
+    conn = connect()
+    # Внешние ключи нельзя переключить внутри транзакции, а пересоздание таблиц требует их отключения
+    conn.execute("PRAGMA foreign_keys=OFF")
+    try:
+        for version, migration in pending:
+            print(f"Обновление схемы базы, миграция {migration.__doc__}")
+            cur = conn.cursor()
+            cur.execute("BEGIN")
+            try:
+                migration(cur)
+                cur.execute("INSERT INTO schema_version VALUES (?)", (version,))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                print(f"Ошибка обновления схемы базы до версии {version}")
+                raise
+
+        problems = conn.execute("PRAGMA foreign_key_check").fetchall()
+        if problems:
+            print(f"Предупреждение: в базе есть записи с неверными ссылками: {problems[:5]}")
+    finally:
+        conn.execute(f"PRAGMA foreign_keys={DB_PRAGMAS.get('foreign_keys', 'OFF')}")
+
+
+def _load_image(image_data, image_hash):
+    """Возвращает байты фото из базы или из файлового хранилища"""
+    if image_hash:
+        return photo_store.read(image_hash)
+    return image_data
+
+
+def _release_files(cur, image_hashes):
+    """Удаляет из хранилища файлы, на которые больше не ссылается ни одно фото"""
+    for image_hash in set(image_hashes):
+        cur.execute("SELECT 1 FROM photos WHERE image_hash=? LIMIT 1", (image_hash,))
+        if cur.fetchone() is None:
+            photo_store.delete(image_hash)
 
 
 def add_person(first_name, last_name, academic_group, description=None):
@@ -55,17 +316,93 @@ def add_person(first_name, last_name, academic_group, description=None):
             (first_name, last_name, academic_group, description)
         )
         conn.commit()
-        return cur.lastrowid
+        person_id = cur.lastrowid
+
+    _cache_person((person_id, first_name, last_name, academic_group, description))
+    _notify("person_added", person_id=person_id, first_name=first_name, last_name=last_name)
+    return person_id
 
 
 def add_photo(person_id, file_name, file_format, file_size, image_bytes):
+    image_data, image_hash = image_bytes, None
+    if PHOTO_STORAGE == "files":
+        image_data, image_hash = None, photo_store.put(image_bytes)
+
     with connect() as conn:
         cur = conn.cursor()
         cur.execute(
-            "INSERT INTO photos VALUES (NULL, ?, ?, ?, ?, ?)",
-            (person_id, file_name, file_format, file_size, image_bytes)
+            "INSERT INTO photos (person_id, file_name, file_format, file_size, image_data, image_hash) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (person_id, file_name, file_format, file_size, image_data, image_hash)
         )
         conn.commit()
+        photo_id = cur.lastrowid
+
+    _notify("photo_added", person_id=person_id, photo_id=photo_id, image_bytes=image_bytes)
+    return photo_id
+
+
+def load_person_cache():
+    """Загружает всех людей в кэш (вызывается при старте и после изменений в обход модуля)"""
+    global _person_cache
+    with connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM persons")
+        cache = {row[0]: row for row in cur.fetchall()}
+    with _person_cache_lock:
+        _person_cache = cache
+
+
+def _get_person_cache():
+    if _person_cache is None:
+        load_person_cache()
+    return _person_cache
+
+
+def _cache_person(row):
+    with _person_cache_lock:
+        if _person_cache is not None:
+            _person_cache[row[0]] = row
+
+
+def _uncache_person(person_id):
+    with _person_cache_lock:
+        if _person_cache is not None:
+            _person_cache.pop(person_id, None)
+
+
+def add_photos_bulk(person_id, photos):
+    """
+    Добавляет пакет фото человека одной транзакцией
+
+    Args:
+        photos: список (file_name, file_format, file_size, image_bytes)
+
+    Returns:
+        list: ID добавленных фото
+    """
+    photos = list(photos)
+    if not photos:
+        return []
+
+    photo_ids = []
+    with connect() as conn:
+        cur = conn.cursor()
+        for file_name, file_format, file_size, image_bytes in photos:
+            image_data, image_hash = image_bytes, None
+            if PHOTO_STORAGE == "files":
+                image_data, image_hash = None, photo_store.put(image_bytes)
+            cur.execute(
+                "INSERT INTO photos (person_id, file_name, file_format, file_size, image_data, image_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (person_id, file_name, file_format, file_size, image_data, image_hash)
+            )
+            photo_ids.append(cur.lastrowid)
+        conn.commit()
+
+    _notify("photos_added", person_id=person_id, photo_ids=photo_ids,
+            images=[photo[3] for photo in photos])
+    return photo_ids
 
 
 def get_all_persons():
@@ -75,11 +412,74 @@ def get_all_persons():
         return cur.fetchall()
 
 
-def get_person_by_id(person_id):
+PERSON_SORT_COLUMNS = ("person_id", "first_name", "last_name", "academic_group")
+
+
+def _like_pattern(text):
+    """
+    Шаблон LIKE для поиска подстроки без учета регистра (сравнивается
+    с casefold(колонка)): %, _ и \\ в тексте ищутся как обычные символы
+    """
+    escaped = text.casefold().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def get_persons_page(after=None, limit=200, search=None, sort_column="person_id", descending=False):
+    """
+    Возвращает страницу людей (person_id, first_name, last_name, academic_group)
+
+    Используется постраничная выборка по ключу: следующая страница начинается
+    после последней строки предыдущей, поэтому время запроса не зависит от того,
+    сколько страниц уже загружено.
+
+    Args:
+        after: (значение колонки сортировки, person_id) последней загруженной строки
+            или None для первой страницы
+        limit: размер страницы
+        search: подстрока для поиска по имени, фамилии и группе
+        sort_column: колонка сортировки из PERSON_SORT_COLUMNS
+        descending: сортировка по убыванию
+    """
+    if sort_column not in PERSON_SORT_COLUMNS:
+        raise ValueError(f"Недопустимая колонка сортировки: {sort_column}")
+
+    conditions = []
+    params = []
+
+    if search:
+        conditions.append("(casefold(first_name) LIKE ? ESCAPE '\\' "
+                          "OR casefold(last_name) LIKE ? ESCAPE '\\' "
+                          "OR casefold(academic_group) LIKE ? ESCAPE '\\')")
+        params += [_like_pattern(search)] * 3
+
+    op = "<" if descending else ">"
+    if after is not None:
+        if sort_column == "person_id":
+            conditions.append(f"person_id {op} ?")
+            params.append(after[1])
+        else:
+            # Сравнение пар позволяет SQLite сразу перейти к нужному месту индекса
+            conditions.append(f"({sort_column}, person_id) {op} (?, ?)")
+            params += [after[0], after[1]]
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    direction = "DESC" if descending else "ASC"
+    order = f"person_id {direction}" if sort_column == "person_id" else \
+        f"{sort_column} {direction}, person_id {direction}"
+
     with connect() as conn:
         cur = conn.cursor()
-        cur.execute("SELECT * FROM persons WHERE person_id=?", (person_id,))
-        return cur.fetchone()
+        cur.execute(
+            f"SELECT person_id, first_name, last_name, academic_group FROM persons {where} "
+            f"ORDER BY {order} LIMIT ?",
+            params + [limit]
+        )
+        return cur.fetchall()
+
+
+def get_person_by_id(person_id):
+    """Возвращает строку persons из кэша, без обращения к базе"""
+    return _get_person_cache().get(person_id)
 
 
 def update_person(person_id, first_name, last_name, academic_group, description):
@@ -90,24 +490,91 @@ def update_person(person_id, first_name, last_name, academic_group, description)
             (first_name, last_name, academic_group, description, person_id)
         )
         conn.commit()
+        updated = cur.rowcount > 0
+
+    # Человек мог быть удален, пока была открыта форма: в кэш его не возвращаем
+    if updated:
+        _cache_person((person_id, first_name, last_name, academic_group, description))
+        _notify("person_updated", person_id=person_id, first_name=first_name, last_name=last_name)
+    return updated
 
 
 def delete_person(person_id):
     with connect() as conn:
         cur = conn.cursor()
-        cur.execute("DELETE FROM photos WHERE person_id=?", (person_id,))
-        cur.execute("DELETE FROM recognition_logs WHERE recognized_person_id=?", (person_id,))
+        cur.execute("SELECT image_hash FROM photos WHERE person_id=? AND image_hash IS NOT NULL", (person_id,))
+        image_hashes = [row[0] for row in cur.fetchall()]
+
+        # Фото и записи журнала удаляются каскадно (ON DELETE CASCADE)
         cur.execute("DELETE FROM persons WHERE person_id=?", (person_id,))
         conn.commit()
 
+        _release_files(cur, image_hashes)
+
+    _uncache_person(person_id)
+    _notify("person_deleted", person_id=person_id)
+
+
+def count_photos():
+    with connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM photos")
+        return cur.fetchone()[0]
+
+
+def iter_photos(batch_size=PHOTO_BATCH, limit=None):
+    """
+    Потоково возвращает (person_id, image_data) всех фото
+
+    Строки читаются пакетами по batch_size, поэтому в памяти одновременно
+    находится не больше одного пакета независимо от размера базы.
+    """
+    conn = connect()
+    cur = conn.cursor()
+    try:
+        if limit is None:
+            cur.execute("SELECT person_id, image_data, image_hash FROM photos")
+        else:
+            cur.execute("SELECT person_id, image_data, image_hash FROM photos LIMIT ?", (limit,))
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            for person_id, data, image_hash in rows:
+                yield person_id, _load_image(data, image_hash)
+    finally:
+        cur.close()
+
 
-def get_all_photos():
+def get_photo_index():
+    """Возвращает (photo_id, person_id) всех фото без загрузки изображений"""
     with connect() as conn:
         cur = conn.cursor()
-        cur.execute("SELECT person_id, image_data FROM photos")
+        cur.execute("SELECT photo_id, person_id FROM photos ORDER BY person_id, photo_id")
         return cur.fetchall()
 
 
+def get_photos_by_ids(photo_ids, chunk_size=500):
+    """Возвращает (photo_id, person_id, image_data) для указанных фото"""
+    photo_ids = list(photo_ids)
+    rows = []
+    with connect() as conn:
+        cur = conn.cursor()
+        # Ограничение SQLite на число параметров в запросе
+        for start in range(0, len(photo_ids), chunk_size):
+            chunk = photo_ids[start:start + chunk_size]
+            cur.execute(
+                f"SELECT photo_id, person_id, image_data, image_hash FROM photos "
+                f"WHERE photo_id IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            rows.extend(
+                (photo_id, person_id, _load_image(data, image_hash))
+                for photo_id, person_id, data, image_hash in cur.fetchall()
+            )
+    return rows
+
+
 def add_recognition_log(person_id, score, result):
     with connect() as conn:
         cur = conn.cursor()
@@ -117,11 +584,64 @@ def add_recognition_log(person_id, score, result):
         )
         conn.commit()
 
+
+def add_recognition_logs(rows):
+    """Записывает пакет (время, person_id, сходство, результат) одной транзакцией"""
+    with connect() as conn:
+        conn.executemany("INSERT INTO recognition_logs VALUES (NULL, ?, ?, ?, ?)", rows)
+        conn.commit()
+
+
+def count_photos_by_person(person_id):
+    with connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM photos WHERE person_id=?", (person_id,))
+        return cur.fetchone()[0]
+
+
+def get_photo_ids_by_person(person_id):
+    """Возвращает ID фото человека без загрузки изображений"""
+    with connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT photo_id FROM photos WHERE person_id=? ORDER BY photo_id", (person_id,))
+        return [row[0] for row in cur.fetchall()]
+
+
+def get_photo(photo_id):
+    """Возвращает байты фото или None"""
+    with connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT image_data, image_hash FROM photos WHERE photo_id=?", (photo_id,))
+        row = cur.fetchone()
+    return _load_image(*row) if row else None
+
+
+def get_thumbnail(photo_id):
+    with connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT image FROM thumbnails WHERE photo_id=?", (photo_id,))
+        row = cur.fetchone()
+    return row[0] if row else None
+
+
+def save_thumbnail(photo_id, image_bytes):
+    with connect() as conn:
+        conn.execute("INSERT OR REPLACE INTO thumbnails VALUES (?, ?)", (photo_id, image_bytes))
+        conn.commit()
+
+
+def save_thumbnails(items):
+    """Сохраняет пакет (photo_id, миниатюра) одной транзакцией"""
+    with connect() as conn:
+        conn.executemany("INSERT OR REPLACE INTO thumbnails VALUES (?, ?)", items)
+        conn.commit()
+
+
 def get_photos_by_person(person_id):
     with connect() as conn:
         cur = conn.cursor()
         cur.execute(
-            "SELECT photo_id, image_data FROM photos WHERE person_id=?",
+            "SELECT photo_id, image_data, image_hash FROM photos WHERE person_id=?",
             (person_id,)
         )
-        return cur.fetchall()
+        return [(photo_id, _load_image(data, image_hash)) for photo_id, data, image_hash in cur.fetchall()]
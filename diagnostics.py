@@ -3,8 +3,9 @@ import os
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from database import init_db, get_all_photos, get_all_persons
+from database import init_db, iter_photos, count_photos, get_all_persons
 from recognition import face_recognizer, check_model_status
+from recognition_service import retrain_model
 
 # Инициализируем базу
 init_db()
@@ -13,12 +14,12 @@ print("=== ДИАГНОСТИКА МОДЕЛИ РАСПОЗНАВАНИЯ ===")
 print()
 
 # 1. Проверяем данные в базе
-all_photos = get_all_photos()
+photo_count = count_photos()
 all_persons = get_all_persons()
 
 print(f"1. Данные в базе:")
 print(f"   - Людей: {len(all_persons)}")
-print(f"   - Фотографий: {len(all_photos)}")
+print(f"   - Фотографий: {photo_count}")
 print()
 
 # 2. Проверяем состояние модели
@@ -37,24 +38,22 @@ print(f"   - После загрузки количество лиц: {len(face_
 print()
 
 # 4. Если модель не загружена, пробуем обучить
-if not face_recognizer.is_trained and all_photos:
+if not face_recognizer.is_trained and photo_count:
     print(f"4. Пробуем обучить модель...")
-    success = face_recognizer.train(all_photos, all_persons)
-    print(f"   - train() результат: {success}")
+    # Скрипт без защиты __main__, поэтому обучаем без дочерних процессов
+    success = retrain_model(workers=1)
+    print(f"   - retrain_model() результат: {success}")
     print(f"   - После обучения is_trained: {face_recognizer.is_trained}")
     print(f"   - После обучения количество лиц: {len(face_recognizer.labels)}")
-
-    if success:
-        face_recognizer.save_model()
-        print(f"   - Модель сохранена")
 print()
 
 # 5. Тестируем функцию compare_faces
 print(f"5. Тестируем compare_faces:")
-if face_recognizer.is_trained and all_photos:
+if face_recognizer.is_trained and photo_count:
     try:
-        # Берем первое фото из базы
-        person_id, first_blob = all_photos[0]
+        # Берем из базы только первые два фото
+        test_photos = list(iter_photos(limit=2))
+        person_id, first_blob = test_photos[0]
 
         # Декодируем фото
         import cv2
@@ -66,9 +65,9 @@ if face_recognizer.is_trained and all_photos:
         score = face_recognizer.compare_faces(test_face, test_face)
         print(f"   - compare_faces(то_же_лицо, то_же_лицо): {score:.1f}%")
 
-        if len(all_photos) > 1:
+        if len(test_photos) > 1:
             # Берем фото другого человека если есть
-            person_id2, second_blob = all_photos[1]
+            person_id2, second_blob = test_photos[1]
             if person_id != person_id2:
                 test_face2 = cv2.imdecode(np.frombuffer(second_blob, np.uint8), cv2.IMREAD_GRAYSCALE)
                 score2 = face_recognizer.compare_faces(test_face, test_face2)
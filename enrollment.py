@@ -0,0 +1,155 @@
+"""
+Фоновое добавление фото человека (съемка с камеры и загрузка из файлов).
+
+Детекция лица и кодирование JPEG выполняются в пуле потоков (OpenCV
+отпускает GIL, поэтому потоки работают параллельно), а все фото сессии
+записываются в базу одной транзакцией через add_photos_bulk. GUI получает
+только сигналы прогресса и завершения; finished_enrollment приходит после
+записи в базу, поэтому GUI не нужно дожидаться потока.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import cv2
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from database import add_photos_bulk, close_thread_connection
+from image_utils import extract_face, image_to_bytes
+
+ENROLL_WORKERS = min(4, os.cpu_count() or 1)  # Потоков для детекции и кодирования
+CAPTURE_INTERVAL_MS = 100  # Как часто брать кадр с камеры при съемке
+
+
+def encode_face(image, file_name):
+    """Находит лицо на изображении и кодирует его в JPEG, возвращает строку для add_photos_bulk или None"""
+    if image is None:
+        return None
+
+    face = extract_face(image)
+    if face is None:
+        return None
+
+    data = image_to_bytes(face)
+    if data is None:
+        return None
+    return file_name, "jpg", len(data), data
+
+
+def encode_file(path):
+    """То же, что encode_face, для файла на диске"""
+    return encode_face(cv2.imread(path), path)
+
+
+class EnrollmentWorker(QThread):
+    """Базовый поток добавления фото: сбор фото и запись их одной транзакцией"""
+
+    progress = pyqtSignal(int, int)  # обработано, всего
+    finished_enrollment = pyqtSignal(int)  # сохранено фото (после записи в базу)
+    failed = pyqtSignal(str)
+
+    def __init__(self, person_id, parent=None):
+        super().__init__(parent)
+        self.person_id = person_id
+        self.saved = 0
+        self._running = False
+
+    def _save(self, photos):
+        """Записывает все фото сессии одной транзакцией"""
+        try:
+            self.saved = len(add_photos_bulk(self.person_id, photos))
+            self.finished_enrollment.emit(self.saved)
+        except Exception as e:
+            print(f"Ошибка сохранения фото: {e}")
+            self.failed.emit(str(e))
+
+    def request_stop(self):
+        """Просит поток завершиться, не дожидаясь его; уже обработанные фото сохраняются"""
+        self._running = False
+
+    def stop(self):
+        """Останавливает поток и дожидается сохранения фото (при выходе из приложения)"""
+        self.request_stop()
+        self.wait()
+
+
+class FileEnrollmentWorker(EnrollmentWorker):
+    """Добавление фото из файлов"""
+
+    def __init__(self, person_id, paths, workers=ENROLL_WORKERS, parent=None):
+        super().__init__(person_id, parent)
+        self.paths = list(paths)
+        self.workers = workers
+
+    def run(self):
+        try:
+            self._run()
+        finally:
+            close_thread_connection()
+
+    def _run(self):
+        self._running = True
+        total = len(self.paths)
+        results = [None] * total
+
+        with ThreadPoolExecutor(self.workers) as pool:
+            futures = {pool.submit(encode_file, path): i for i, path in enumerate(self.paths)}
+            for done, future in enumerate(as_completed(futures), 1):
+                if not self._running:
+                    # Отменяем то, что еще не начало выполняться
+                    for pending in futures:
+                        pending.cancel()
+                    break
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    print(f"Ошибка обработки файла {self.paths[futures[future]]}: {e}")
+                self.progress.emit(done, total)
+
+        # Фото сохраняются в порядке выбора файлов
+        self._save([photo for photo in results if photo is not None])
+
+
+class CameraEnrollmentWorker(EnrollmentWorker):
+    """Автоматическая съемка заданного числа фото с общего сервиса камеры"""
+
+    def __init__(self, person_id, camera_manager, total, interval_ms=CAPTURE_INTERVAL_MS,
+                 workers=ENROLL_WORKERS, parent=None):
+        super().__init__(person_id, parent)
+        self.camera_manager = camera_manager
+        self.total = total
+        self.interval_ms = interval_ms
+        self.workers = workers
+
+    def run(self):
+        try:
+            self._run()
+        finally:
+            close_thread_connection()
+
+    def _run(self):
+        self._running = True
+        photos = []
+        pending = set()
+        last_seq = None
+
+        with ThreadPoolExecutor(self.workers) as pool:
+            while self._running and len(photos) < self.total:
+                # Берем последний кадр из буфера, не отнимая его у предпросмотра
+                seq, frame = self.camera_manager.latest_frame()
+                if frame is not None and seq != last_seq and len(pending) < 2 * self.workers:
+                    last_seq = seq
+                    pending.add(pool.submit(encode_face, frame, ""))
+
+                for future in [f for f in pending if f.done()]:
+                    pending.discard(future)
+                    photo = future.result() if future.exception() is None else None
+                    if photo is not None and len(photos) < self.total:
+                        photos.append((f"auto_capture_{len(photos)}",) + photo[1:])
+                        self.progress.emit(len(photos), self.total)
+
+                self.msleep(self.interval_ms)
+
+            for future in pending:
+                future.cancel()
+
+        self._save(photos)
@@ -0,0 +1,100 @@
+"""
+Постоянный кэш признаков LBPH для обучающих фото.
+
+Гистограммы хранятся в отдельном файле SQLite по ключу photo_id вместе с хэшем
+версии предобработки. При переобучении декодируются и обрабатываются только
+фото, которых нет в кэше; смена предобработки или параметров LBPH меняет хэш,
+и старые записи перестают использоваться.
+"""
+import sqlite3
+import zlib
+from contextlib import contextmanager
+
+import numpy as np
+
+FEATURE_CACHE_DB = "face_features.db"
+FETCH_BATCH = 256  # Сколько строк читать из кэша за раз
+
+
+class FeatureCache:
+    """Кэш гистограмм LBPH по photo_id"""
+
+    def __init__(self, version, path=FEATURE_CACHE_DB):
+        self.version = version
+        self.path = path
+
+        with self._connect() as conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS features (
+                photo_id INTEGER PRIMARY KEY,
+                version TEXT NOT NULL,
+                histogram BLOB NOT NULL
+            )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        """Соединение на одну операцию: фиксирует транзакцию (или откатывает при ошибке) и закрывается"""
+        conn = sqlite3.connect(self.path)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def load_into(self, positions, matrix):
+        """
+        Заполняет строки матрицы гистограммами из кэша
+
+        Args:
+            positions: dict photo_id -> номер строки в matrix
+            matrix: (N, dim) float32
+
+        Returns:
+            set: photo_id, для которых гистограмма нашлась в кэше
+        """
+        found = set()
+        row_bytes = matrix.shape[1] * matrix.itemsize
+
+        with self._connect() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT photo_id, histogram FROM features WHERE version=?", (self.version,))
+            while True:
+                rows = cur.fetchmany(FETCH_BATCH)
+                if not rows:
+                    break
+                for photo_id, blob in rows:
+                    row = positions.get(photo_id)
+                    if row is None:
+                        continue
+                    data = zlib.decompress(blob)
+                    if len(data) != row_bytes:
+                        continue
+                    matrix[row] = np.frombuffer(data, dtype=np.float32)
+                    found.add(photo_id)
+
+        return found
+
+    def put_many(self, items):
+        """Сохраняет гистограммы: items - список (photo_id, histogram)"""
+        rows = [
+            (photo_id, self.version, zlib.compress(np.asarray(hist, dtype=np.float32).tobytes(), 1))
+            for photo_id, hist in items
+        ]
+        if not rows:
+            return
+
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO features VALUES (?, ?, ?)", rows)
+
+    def prune(self, valid_photo_ids):
+        """Удаляет записи старых версий и удаленных фото"""
+        with self._connect() as conn:
+            cur = conn.cursor()
+            cur.execute("CREATE TEMP TABLE valid_photos (photo_id INTEGER PRIMARY KEY)")
+            cur.executemany("INSERT INTO valid_photos VALUES (?)", ((i,) for i in valid_photo_ids))
+            cur.execute(
+                "DELETE FROM features WHERE version<>? OR photo_id NOT IN (SELECT photo_id FROM valid_photos)",
+                (self.version,)
+            )
+            cur.execute("DROP TABLE valid_photos")
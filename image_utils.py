@@ -1,16 +1,265 @@
 import cv2
 import os
+import threading
 
-face_cascade = cv2.CascadeClassifier("haarcascade_frontalface_default.xml")
+CASCADE_FILE = "haarcascade_frontalface_default.xml"
 
+face_cascade = cv2.CascadeClassifier(CASCADE_FILE)
+_cascade_local = threading.local()
 
-def extract_face(image):
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+# Параметры режима слежения (FaceTracker)
+TRACK_DETECT_EVERY = 10  # Полная детекция каскадом раз в N кадров
+TRACK_MIN_CONFIDENCE = 0.6  # Ниже этой оценки шаблон считается потерянным
+TRACK_SEARCH_MARGIN = 0.5  # Окно поиска вокруг лица, в долях его размера
+
+
+class DetectionConfig:
+    """
+    Настройки детекции лиц каскадом Хаара
+
+    Args:
+        scale_factor, min_neighbors: параметры detectMultiScale
+        detect_width: ширина, до которой уменьшается кадр перед детекцией (None - без уменьшения)
+        roi: область интереса (x, y, w, h) в долях кадра от 0 до 1 (None - весь кадр)
+        min_face_size, max_face_size: допустимый размер лица (w, h) в пикселях исходного кадра
+    """
+
+    def __init__(self, scale_factor=1.3, min_neighbors=5, detect_width=640, roi=None,
+                 min_face_size=None, max_face_size=None):
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.detect_width = detect_width
+        self.roi = roi
+        self.min_face_size = min_face_size
+        self.max_face_size = max_face_size
+
+
+# Настройки по умолчанию для всего приложения
+detection_config = DetectionConfig()
+
+
+def prepare_detection_image(image, config=None):
+    """
+    Готовит изображение для детекции: вырезает область интереса,
+    переводит в оттенки серого и уменьшает до config.detect_width
+
+    Returns:
+        tuple: (уменьшенное серое изображение, масштаб, смещение (ox, oy) области интереса)
+    """
+    config = config or detection_config
+    h, w = image.shape[:2]
+
+    ox = oy = 0
+    if config.roi is not None:
+        fx, fy, fw, fh = config.roi
+        ox, oy = int(fx * w), int(fy * h)
+        image = image[oy:oy + int(fh * h), ox:ox + int(fw * w)]
+
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    scale = 1.0
+    if config.detect_width and image.shape[1] > config.detect_width:
+        scale = config.detect_width / image.shape[1]
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    return image, scale, (ox, oy)
+
+
+def _scaled_size(size, scale):
+    """Переводит размер лица из пикселей кадра в пиксели уменьшенного изображения"""
+    if size is None:
+        return (0, 0)
+    return (int(size[0] * scale), int(size[1] * scale))
+
+
+def get_face_cascade():
+    """Каскад для текущего потока: один экземпляр нельзя использовать из нескольких потоков сразу"""
+    if threading.current_thread() is threading.main_thread():
+        return face_cascade
+    cascade = getattr(_cascade_local, "cascade", None)
+    if cascade is None:
+        cascade = _cascade_local.cascade = cv2.CascadeClassifier(CASCADE_FILE)
+    return cascade
+
+
+def _detect_scaled(small, scale, config):
+    """Запускает каскад на подготовленном изображении, боксы - в его координатах"""
+    faces = get_face_cascade().detectMultiScale(
+        small,
+        config.scale_factor,
+        config.min_neighbors,
+        minSize=_scaled_size(config.min_face_size, scale),
+        maxSize=_scaled_size(config.max_face_size, scale)
+    )
+    return [tuple(int(v) for v in face) for face in faces]
+
+
+def _to_frame_box(box, scale, offset, shape):
+    """Переводит бокс из координат уменьшенного изображения в координаты кадра"""
+    x, y, w, h = (int(round(v / scale)) for v in box)
+    x, y = x + offset[0], y + offset[1]
+    w = min(w, shape[1] - x)
+    h = min(h, shape[0] - y)
+    return x, y, w, h
+
+
+def detect_faces(image, config=None):
+    """Ищет лица на изображении (BGR или серое), возвращает список (x, y, w, h) в координатах кадра"""
+    config = config or detection_config
+    small, scale, offset = prepare_detection_image(image, config)
+    return [_to_frame_box(box, scale, offset, image.shape) for box in _detect_scaled(small, scale, config)]
+
+
+def crop_face(image, box):
+    """Вырезает лицо из кадра в полном разрешении и переводит в оттенки серого"""
+    x, y, w, h = box
+    face = image[y:y+h, x:x+w]
+    if face.ndim == 3:
+        face = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+    return face
+
+
+def extract_face(image, config=None):
+    faces = detect_faces(image, config)
     if len(faces) == 0:
         return None
-    x, y, w, h = faces[0]
-    return gray[y:y+h, x:x+w]
+    return crop_face(image, faces[0])
+
+
+def extract_faces(image, config=None):
+    """Извлекает все лица кадра, возвращает список (лицо в оттенках серого, (x, y, w, h))"""
+    return [(crop_face(image, box), box) for box in detect_faces(image, config)]
+
+
+def _box_iou(a, b):
+    """Доля пересечения двух прямоугольников (x, y, w, h)"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    ih = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = iw * ih
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+class FaceTracker:
+    """
+    Извлечение лиц из видеопотока с редкой детекцией.
+
+    Каскад Хаара запускается раз в detect_every кадров или когда слежение
+    теряет уверенность. Между детекциями лицо ведется сопоставлением шаблона
+    в небольшом окне вокруг последнего положения, что в разы дешевле
+    полного detectMultiScale по всему кадру.
+
+    Трек, потерявший уверенность, свой ID не передает: на его месте
+    может оказаться уже другой человек (следующий у турникета), которому
+    нельзя наследовать результаты распознавания предыдущего.
+    """
+
+    def __init__(self, detect_every=TRACK_DETECT_EVERY, min_confidence=TRACK_MIN_CONFIDENCE,
+                 search_margin=TRACK_SEARCH_MARGIN, config=None):
+        self.config = config or detection_config
+        self.detect_every = detect_every
+        self.min_confidence = min_confidence
+        self.search_margin = search_margin
+        self.tracks = []  # [{'id', 'box', 'template'}], боксы - в координатах изображения детекции
+        self._frames_since_detect = 0
+        self._next_id = 1
+
+    def reset(self):
+        """Сбрасывает все треки (например, при перезапуске камеры)"""
+        self.tracks = []
+        self._frames_since_detect = 0
+
+    def update(self, image):
+        """
+        Обновляет положение лиц на новом кадре
+
+        Returns:
+            list: [(track_id, (x, y, w, h))] в координатах кадра
+        """
+        # Слежение идет на том же уменьшенном изображении области интереса, что и детекция
+        gray, scale, offset = prepare_detection_image(image, self.config)
+
+        need_detect = not self.tracks or self._frames_since_detect >= self.detect_every
+        lost = set()  # ID треков, потерявших уверенность
+
+        if not need_detect:
+            followed = []
+            for track in self.tracks:
+                box, score = self._follow(gray, track)
+                if score < self.min_confidence:
+                    lost.add(track['id'])
+                else:
+                    followed.append((track, box))
+
+            if lost:
+                need_detect = True
+            else:
+                for track, box in followed:
+                    self._set_box(gray, track, box)
+                self._frames_since_detect += 1
+
+        if need_detect:
+            self._detect(gray, scale, lost)
+
+        return [(track['id'], _to_frame_box(track['box'], scale, offset, image.shape))
+                for track in self.tracks]
+
+    def extract(self, image):
+        """Аналог extract_face для видеопотока: возвращает лицо первого трека или None"""
+        tracks = self.update(image)
+        if not tracks:
+            return None
+        return crop_face(image, tracks[0][1])
+
+    def extract_all(self, image):
+        """Аналог extract_faces для видеопотока: возвращает список (track_id, лицо, бокс)"""
+        return [(track_id, crop_face(image, box), box) for track_id, box in self.update(image)]
+
+    def _detect(self, gray, scale, lost=()):
+        """Полная детекция каскадом с сохранением ID совпавших треков (кроме потерянных)"""
+        previous = [track for track in self.tracks if track['id'] not in lost]
+        self.tracks = []
+        self._frames_since_detect = 0
+
+        for box in _detect_scaled(gray, scale, self.config):
+            # Лицо, заметно пересекающееся со старым треком, сохраняет его ID
+            best = max(previous, key=lambda t: _box_iou(t['box'], box), default=None)
+            if best is not None and _box_iou(best['box'], box) > 0.3:
+                previous.remove(best)
+                track = best
+            else:
+                track = {'id': self._next_id}
+                self._next_id += 1
+
+            self._set_box(gray, track, box)
+            self.tracks.append(track)
+
+    def _follow(self, gray, track):
+        """Ищет шаблон трека в окне вокруг последнего положения, возвращает (box, оценка)"""
+        x, y, w, h = track['box']
+        mx = int(w * self.search_margin)
+        my = int(h * self.search_margin)
+
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(gray.shape[1], x + w + mx), min(gray.shape[0], y + h + my)
+        window = gray[y0:y1, x0:x1]
+
+        template = track['template']
+        if window.shape[0] < template.shape[0] or window.shape[1] < template.shape[1]:
+            return track['box'], 0.0
+
+        scores = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+        _, max_score, _, (dx, dy) = cv2.minMaxLoc(scores)
+        return (x0 + dx, y0 + dy, w, h), max_score
+
+    def _set_box(self, gray, track, box):
+        """Запоминает положение трека и обновляет его шаблон"""
+        x, y, w, h = box
+        track['box'] = box
+        track['template'] = gray[y:y+h, x:x+w].copy()
 
 
 def image_to_bytes(image, fmt=".jpg"):
@@ -28,4 +277,4 @@ def get_file_info(path):
     name = os.path.basename(path)
     fmt = os.path.splitext(name)[1].replace(".", "")
     size = os.path.getsize(path)
-    return name, fmt, size
\ No newline at end of file
+    return name, fmt, size
@@ -0,0 +1,424 @@
+"""
+Векторизованная реализация LBPH (Local Binary Patterns Histograms) на NumPy.
+
+Признаки и расстояния совпадают с cv2.face.LBPHFaceRecognizer (круговой LBP
+с билинейной интерполяцией, нормированные гистограммы по ячейкам сетки,
+HISTCMP_CHISQR_ALT), что проверяется тестами и benchmark_lbph.py. Старые модели
+OpenCV все равно переобучаются: их гистограммы посчитаны прежней предобработкой.
+Все гистограммы галереи хранятся в одной непрерывной матрице float32, а
+расстояния хи-квадрат до всей галереи считаются векторными операциями по
+блокам строк, параллельно в нескольких потоках.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+GALLERY_CHUNK_ROWS = 512  # Строк галереи в одной задаче потока при сравнении
+CACHE_BLOCK_ELEMENTS = 1 << 17  # Элементов промежуточного массива, помещающихся в кэш
+SEARCH_WORKERS = min(4, os.cpu_count() or 1)  # Потоков для сравнения с большой галереей
+HISTOGRAM_BATCH = 256  # Сколько изображений переводить в гистограммы за раз
+
+# Режим поиска по галерее: "flat" - полный перебор, "prototype" - через прототипы людей
+INDEX_MODE = "flat"
+PROTOTYPES_PER_PERSON = 4  # Сколько прототипов (центров кластеров) хранить на человека
+PROTOTYPE_ITERATIONS = 5  # Итераций кластеризации при построении прототипов
+SHORTLIST_SIZE = 5  # Сколько людей отбирать по прототипам для точного сравнения
+
+_FLOAT_EPS = np.finfo(np.float32).eps
+_TINY = np.float32(1e-30)  # Много меньше любого ненулевого значения нормированной гистограммы
+
+
+class LBPHExtractor:
+    """Вычисление пространственных гистограмм LBP для пачки изображений"""
+
+    def __init__(self, radius=1, neighbors=8, grid_x=7, grid_y=7):
+        self.radius = radius
+        self.neighbors = neighbors
+        self.grid_x = grid_x
+        self.grid_y = grid_y
+        self.num_patterns = 2 ** neighbors
+        self.dim = grid_x * grid_y * self.num_patterns
+
+        # Смещения и веса билинейной интерполяции для каждой точки окружности
+        self._points = []
+        for n in range(neighbors):
+            x = np.float32(radius * np.cos(2.0 * np.pi * n / neighbors))
+            y = np.float32(-radius * np.sin(2.0 * np.pi * n / neighbors))
+            fx, fy = int(np.floor(x)), int(np.floor(y))
+            cx, cy = int(np.ceil(x)), int(np.ceil(y))
+            tx, ty = np.float32(x - fx), np.float32(y - fy)
+            weights = (
+                np.float32((1 - tx) * (1 - ty)),
+                np.float32(tx * (1 - ty)),
+                np.float32((1 - tx) * ty),
+                np.float32(tx * ty),
+            )
+            self._points.append((fx, fy, cx, cy, weights))
+
+        self._cell_index_cache = {}
+
+    def lbp(self, images):
+        """Возвращает коды LBP для пачки изображений (N, H, W) uint8"""
+        images = np.asarray(images, dtype=np.float32)
+        r = self.radius
+        n_img, h, w = images.shape
+
+        center = images[:, r:h - r, r:w - r]
+        codes = np.zeros(center.shape, dtype=np.int32)
+
+        def shifted(dy, dx):
+            return images[:, r + dy:h - r + dy, r + dx:w - r + dx]
+
+        for n, (fx, fy, cx, cy, (w1, w2, w3, w4)) in enumerate(self._points):
+            t = w1 * shifted(fy, fx) + w2 * shifted(fy, cx) + w3 * shifted(cy, fx) + w4 * shifted(cy, cx)
+            bit = (t > center) | (np.abs(t - center) < _FLOAT_EPS)
+            codes |= bit.astype(np.int32) << n
+
+        return codes
+
+    def histograms(self, images):
+        """
+        Возвращает матрицу гистограмм (N, dim) float32 для пачки изображений
+
+        Большие пачки обрабатываются частями по HISTOGRAM_BATCH изображений.
+        """
+        images = np.asarray(images)
+        if images.ndim == 2:
+            images = images[np.newaxis]
+
+        result = np.empty((len(images), self.dim), dtype=np.float32)
+        for start in range(0, len(images), HISTOGRAM_BATCH):
+            batch = images[start:start + HISTOGRAM_BATCH]
+            result[start:start + len(batch)] = self._histograms(self.lbp(batch))
+        return result
+
+    def _histograms(self, codes):
+        n_img, h, w = codes.shape
+        cell_h, cell_w = h // self.grid_y, w // self.grid_x
+
+        # Пиксели за пределами целых ячеек сетки не учитываются (как в OpenCV)
+        codes = codes[:, :cell_h * self.grid_y, :cell_w * self.grid_x]
+        cell_index = self._cell_index(cell_h, cell_w)
+
+        flat = (cell_index[np.newaxis] + codes).reshape(n_img, -1)
+        flat += (np.arange(n_img, dtype=np.int64) * self.dim)[:, np.newaxis]
+
+        counts = np.bincount(flat.ravel(), minlength=n_img * self.dim)
+        return (counts * (1.0 / (cell_h * cell_w))).astype(np.float32).reshape(n_img, self.dim)
+
+    def _cell_index(self, cell_h, cell_w):
+        """Смещение гистограммы ячейки для каждого пикселя карты LBP"""
+        key = (cell_h, cell_w)
+        if key not in self._cell_index_cache:
+            rows = np.arange(cell_h * self.grid_y) // cell_h
+            cols = np.arange(cell_w * self.grid_x) // cell_w
+            cells = rows[:, np.newaxis] * self.grid_x + cols[np.newaxis, :]
+            self._cell_index_cache[key] = cells.astype(np.int64) * self.num_patterns
+        return self._cell_index_cache[key]
+
+
+_search_pool = None
+_search_pool_lock = threading.Lock()
+
+
+def _get_search_pool():
+    """Общий пул потоков сравнения (NumPy и BLAS отпускают GIL)"""
+    global _search_pool
+    with _search_pool_lock:
+        if _search_pool is None:
+            _search_pool = ThreadPoolExecutor(SEARCH_WORKERS, thread_name_prefix="lbph-search")
+        return _search_pool
+
+
+def _chi_square_rows(probes, shifted, probe_sums, gallery, out):
+    """Расстояния от всех зондов до блока строк галереи, результат (P, rows) в out"""
+    n_probes, dim = probes.shape
+    rows = max(1, min(len(gallery), CACHE_BLOCK_ELEMENTS // (n_probes * dim)))
+    ones = np.ones(dim, dtype=np.float32)
+    ratio_buffer = np.empty((n_probes, rows, dim), dtype=np.float32)
+
+    for start in range(0, len(gallery), rows):
+        chunk = gallery[start:start + rows]
+        ratio = ratio_buffer[:, :len(chunk)]
+        # Все зонды сразу: g / (g + p) для каждой пары (зонд, строка)
+        np.add(chunk[np.newaxis], shifted[:, np.newaxis], out=ratio)
+        np.divide(chunk[np.newaxis], ratio, out=ratio)
+        weighted = np.matmul(ratio, probes[:, :, np.newaxis])[:, :, 0]
+        out[:, start:start + len(chunk)] = (chunk @ ones)[np.newaxis] + probe_sums[:, np.newaxis] - 4 * weighted
+
+
+def chi_square_distances(probes, gallery, workers=None):
+    """
+    Расстояния хи-квадрат (HISTCMP_CHISQR_ALT) от каждого зонда до каждой строки галереи
+
+    Используется тождество (g - p)^2 / (g + p) = g + p - 4gp / (g + p): на элемент
+    приходятся только сложение и деление, а суммы считаются умножением матрицы
+    на вектор (BLAS). Галерея делится на задачи по GALLERY_CHUNK_ROWS строк,
+    которые выполняются в пуле потоков; внутри задачи строки обрабатываются
+    блоками, помещающимися в кэш, сразу для всех зондов.
+
+    Args:
+        probes: (P, dim) float32
+        gallery: (G, dim) float32
+        workers: 1 - считать в текущем потоке, иначе в пуле из SEARCH_WORKERS потоков
+
+    Returns:
+        np.ndarray: (P, G) float32
+    """
+    probes = np.ascontiguousarray(probes, dtype=np.float32)
+    n_probes, dim = probes.shape
+    result = np.empty((n_probes, len(gallery)), dtype=np.float32)
+    if len(gallery) == 0 or n_probes == 0:
+        return result
+
+    # Пустая корзина в обеих гистограммах дает 0 / _TINY = 0
+    shifted = probes + _TINY
+    probe_sums = probes.sum(axis=1)
+    starts = range(0, len(gallery), GALLERY_CHUNK_ROWS)
+    workers = SEARCH_WORKERS if workers is None else workers
+
+    def run(start):
+        stop = start + GALLERY_CHUNK_ROWS
+        _chi_square_rows(probes, shifted, probe_sums, gallery[start:stop], result[:, start:stop])
+
+    if workers > 1 and len(starts) > 1:
+        list(_get_search_pool().map(run, starts))
+    else:
+        for start in starts:
+            run(start)
+
+    # Ошибка округления около нуля не должна давать отрицательных расстояний
+    np.maximum(result, 0, out=result)
+    result *= 2
+    return result
+
+
+def _cluster(samples, k, iterations=PROTOTYPE_ITERATIONS):
+    """
+    Разбивает гистограммы одного человека на k кластеров по расстоянию хи-квадрат
+
+    Начальные центры выбираются методом самой дальней точки, затем уточняются
+    несколькими итерациями Ллойда. Возвращает центры кластеров (k, dim).
+    """
+    if len(samples) <= k:
+        return samples.copy()
+
+    # Первый центр - образец, ближайший к среднему, далее - самые удаленные от выбранных
+    nearest = chi_square_distances(samples.mean(axis=0, keepdims=True), samples)[0]
+    chosen = [int(np.argmin(nearest))]
+    min_dist = chi_square_distances(samples[chosen], samples)[0]
+    while len(chosen) < k:
+        chosen.append(int(np.argmax(min_dist)))
+        min_dist = np.minimum(min_dist, chi_square_distances(samples[chosen[-1:]], samples)[0])
+
+    centers = samples[chosen].copy()
+    for _ in range(iterations):
+        assignment = np.argmin(chi_square_distances(samples, centers), axis=1)
+        for c in range(k):
+            members = samples[assignment == c]
+            if len(members):
+                centers[c] = members.mean(axis=0)
+    return centers
+
+
+class PrototypeIndex:
+    """
+    Двухэтапный поиск по галерее
+
+    Сначала зонд сравнивается с несколькими прототипами каждого человека и
+    отбираются shortlist ближайших людей, затем результат уточняется по всем
+    образцам только этих людей.
+    """
+
+    def __init__(self, histograms, labels, prototypes_per_person=PROTOTYPES_PER_PERSON,
+                 shortlist=SHORTLIST_SIZE, previous=None, changed_labels=()):
+        self.histograms = histograms
+        self.shortlist = shortlist
+        self.version = None  # Версия галереи, по которой построен индекс
+
+        order = np.argsort(labels, kind="stable")
+        self.person_labels, starts = np.unique(labels[order], return_index=True)
+        self.members = [self._rows(idx) for idx in np.split(order, starts[1:])]
+
+        # Прототипы людей, чьи образцы не менялись, берем из предыдущего индекса
+        reusable = previous.centers if previous is not None else {}
+        self.centers = {}
+        prototypes = []
+        self.prototype_starts = []
+        for label, rows in zip(self.person_labels.tolist(), self.members):
+            centers = reusable.get(label)
+            if centers is None or label in changed_labels:
+                centers = _cluster(histograms[rows], prototypes_per_person)
+            self.centers[label] = centers
+            self.prototype_starts.append(sum(len(p) for p in prototypes))
+            prototypes.append(centers)
+        self.prototypes = np.vstack(prototypes) if prototypes else np.empty((0, histograms.shape[1]), np.float32)
+        self.prototype_starts = np.array(self.prototype_starts, dtype=np.int64)
+
+    @staticmethod
+    def _rows(idx):
+        """Непрерывный диапазон строк превращаем в срез, чтобы не копировать гистограммы"""
+        if len(idx) and idx[-1] - idx[0] + 1 == len(idx) and np.all(np.diff(idx) == 1):
+            return slice(int(idx[0]), int(idx[-1]) + 1)
+        return idx
+
+    def search(self, probes, k=1):
+        if len(self.person_labels) == 0:
+            return [[] for _ in range(len(probes))]
+
+        proto_distances = chi_square_distances(probes, self.prototypes)
+
+        results = []
+        for probe, row in zip(probes, proto_distances):
+            # Лучший прототип каждого человека
+            person_distances = np.minimum.reduceat(row, self.prototype_starts)
+            candidates = np.argsort(person_distances, kind="stable")[:max(k, self.shortlist)]
+
+            matches = []
+            for person in candidates:
+                samples = self.histograms[self.members[person]]
+                distance = chi_square_distances(probe[np.newaxis], samples)[0].min()
+                matches.append((int(self.person_labels[person]), float(distance)))
+
+            matches.sort(key=lambda m: m[1])
+            results.append(matches[:k])
+        return results
+
+
+class LBPHGallery:
+    """
+    Галерея гистограмм: одна непрерывная матрица float32 и массив меток
+
+    Матрица выделяется с запасом, поэтому добавление образцов одного человека
+    не копирует всю галерею. Поиск работает со снимком (histograms, labels),
+    взятым под блокировкой, и не мешает параллельным изменениям.
+    """
+
+    def __init__(self, dim, index_mode=None):
+        self.dim = dim
+        self.index_mode = index_mode  # None - брать текущее значение lbph.INDEX_MODE
+        self._buffer = np.empty((0, dim), dtype=np.float32)
+        self._size = 0
+        self.labels = np.empty(0, dtype=np.int32)
+        self._index = None
+        self._version = 0  # Увеличивается при каждом изменении галереи
+        self._changed_labels = set()  # Люди, чьи прототипы нужно пересчитать
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def histograms(self):
+        """Матрица гистограмм (N, dim) без резерва"""
+        return self._buffer[:self._size]
+
+    @property
+    def version(self):
+        """Номер версии содержимого: меняется при обучении, добавлении и удалении образцов"""
+        return self._version
+
+    def snapshot(self):
+        """Согласованные (histograms, labels) на текущий момент (для поиска и сохранения)"""
+        with self._lock:
+            return self.histograms, self.labels
+
+    def detach(self, mapped):
+        """Копирует гистограммы в память, если они разделяют память с mapped (отображенным файлом)"""
+        with self._lock:
+            if np.may_share_memory(self._buffer, mapped):
+                self._buffer = np.array(self._buffer[:self._size])
+
+    def set(self, histograms, labels):
+        """Заменяет содержимое галереи"""
+        histograms = np.ascontiguousarray(histograms, dtype=np.float32).reshape(-1, self.dim)
+        labels = np.asarray(labels, dtype=np.int32).ravel()
+
+        # Образцы одного человека храним подряд, чтобы индекс прототипов работал со срезами
+        if np.all(labels[:-1] <= labels[1:]):
+            order = slice(None)  # Уже отсортированы - обходимся без копии
+        else:
+            order = np.argsort(labels, kind="stable")
+        with self._lock:
+            self._buffer = histograms[order]
+            self._size = len(labels)
+            self.labels = labels[order]
+            self._index = None
+            self._version += 1
+            self._changed_labels = set()
+
+    def append(self, histograms, labels):
+        """Добавляет образцы в конец галереи"""
+        histograms = np.asarray(histograms, dtype=np.float32).reshape(-1, self.dim)
+        labels = np.asarray(labels, dtype=np.int32).ravel()
+        if len(labels) == 0:
+            return
+
+        with self._lock:
+            size = self._size + len(labels)
+            if size > len(self._buffer):
+                # Новый буфер с запасом; старый остается целым для идущих поисков
+                buffer = np.empty((max(size, 2 * len(self._buffer), 64), self.dim), dtype=np.float32)
+                buffer[:self._size] = self._buffer[:self._size]
+                self._buffer = buffer
+
+            self._buffer[self._size:size] = histograms
+            self.labels = np.concatenate([self.labels, labels])
+            self._size = size
+            self._version += 1
+            self._changed_labels.update(labels.tolist())
+
+    def remove(self, label):
+        """Удаляет все образцы человека, не затрагивая остальных"""
+        with self._lock:
+            keep = self.labels != label
+            if keep.all():
+                return
+            self._buffer = self._buffer[:self._size][keep]
+            self._size = len(self._buffer)
+            self.labels = self.labels[keep]
+            self._version += 1
+            self._changed_labels.add(int(label))
+
+    def search(self, probes, k=1):
+        """
+        Ищет k ближайших людей для каждого зонда
+
+        Returns:
+            list: для каждого зонда список [(label, distance)] длиной до k,
+                  по возрастанию расстояния, по одному лучшему образцу на человека
+        """
+        with self._lock:
+            histograms, labels = self.histograms, self.labels
+            index, version = self._index, self._version
+            changed = set(self._changed_labels)
+
+        if len(labels) == 0:
+            return [[] for _ in range(len(probes))]
+
+        # Модульная настройка читается при каждом поиске: глобальная галерея создается
+        # при импорте recognition, и значение по умолчанию иначе нельзя было бы сменить
+        if (self.index_mode or INDEX_MODE) == "prototype":
+            # Индекс строится лениво при первом поиске после изменения галереи,
+            # прототипы неизменившихся людей переиспользуются
+            if index is None or index.version != version:
+                index = PrototypeIndex(histograms, labels, previous=index, changed_labels=changed)
+                index.version = version
+                with self._lock:
+                    if self._version == version:
+                        self._index = index
+                        self._changed_labels -= changed
+            return index.search(probes, k)
+
+        distances = chi_square_distances(probes, histograms)
+        return [self._top_k(row, labels, k) for row in distances]
+
+    @staticmethod
+    def _top_k(distances, labels, k):
+        order = np.argsort(distances, kind="stable")
+        # Первое вхождение метки в отсортированном порядке - лучший образец человека
+        _, first = np.unique(labels[order], return_index=True)
+        best = order[np.sort(first)[:k]]
+        return [(int(labels[i]), float(distances[i])) for i in best]
@@ -0,0 +1,95 @@
+"""
+Фоновая запись журнала распознаваний.
+
+Распознавание на каждом кадре порождает запись в recognition_logs.
+Вместо отдельной транзакции на каждую запись строки копятся в очереди
+и записываются пакетами в отдельном потоке: по достижении LOG_BATCH_SIZE
+строк или раз в LOG_FLUSH_INTERVAL секунд.
+"""
+import queue
+import threading
+import time
+from datetime import datetime
+
+from database import add_recognition_logs, close_thread_connection
+
+LOG_BATCH_SIZE = 100  # Сколько записей сбрасывать одной транзакцией
+LOG_FLUSH_INTERVAL = 1.0  # Максимальная задержка записи, секунд
+LOG_QUEUE_SIZE = 10000  # При переполнении новые записи отбрасываются
+
+
+class RecognitionLogWriter:
+    """Пакетная запись журнала распознаваний в фоновом потоке"""
+
+    def __init__(self, batch_size=LOG_BATCH_SIZE, flush_interval=LOG_FLUSH_INTERVAL,
+                 max_queue=LOG_QUEUE_SIZE):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0  # Сколько записей потеряно из-за переполнения очереди
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def log(self, person_id, score, result):
+        """Ставит запись в очередь (время фиксируется в момент вызова)"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((datetime.now().isoformat(timespec="seconds"), person_id, score, result))
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self):
+        """Записывает все накопленные записи и останавливает поток"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(None)
+        thread.join()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="RecognitionLogWriter", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        try:
+            self._write_batches()
+        finally:
+            close_thread_connection()
+
+    def _write_batches(self):
+        batch = []
+        deadline = None  # Когда нужно сбросить первую запись пакета
+        running = True
+        while running:
+            timeout = self.flush_interval if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False
+
+            if item is None:
+                running = False
+            elif item is not False:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            if batch and (len(batch) >= self.batch_size or not running or time.monotonic() >= deadline):
+                self._flush(batch)
+                batch = []
+                deadline = None
+
+    def _flush(self, batch):
+        try:
+            add_recognition_logs(batch)
+        except Exception as e:
+            print(f"Ошибка записи журнала распознаваний ({len(batch)} записей): {e}")
+
+
+# Глобальный экземпляр
+recognition_log_writer = RecognitionLogWriter()
@@ -3,7 +3,7 @@ from PyQt5.QtWidgets import QApplication
 from main_window import MainWindow
 from database import init_db
 from recognition import face_recognizer
-from database import get_all_photos, get_all_persons
+from recognition_service import retrain_model
 
 
 def initialize_face_recognition():
@@ -18,20 +18,11 @@ def initialize_face_recognition():
 
     if not model_loaded:
         print("Модель не найдена, обучаю новую...")
-        # Получаем данные для обучения
-        all_photos = get_all_photos()
-        all_persons = get_all_persons()
-
-        if not all_photos:
-            print("В базе нет фотографий для обучения модели")
-            return False
-
-        # Обучаем модель
-        success = face_recognizer.train(all_photos, all_persons)
+        # Обучаем модель (признаки уже обработанных фото берутся из кэша)
+        success = retrain_model()
 
         if success:
             print(f"Модель обучена успешно! Лиц в базе: {len(face_recognizer.labels)}")
-            face_recognizer.save_model()
             return True
         else:
             print("Ошибка обучения модели")
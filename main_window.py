@@ -2,80 +2,26 @@ import sys
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QFrame, QStackedWidget, QTextEdit,
-    QTableView, QMessageBox, QSizePolicy, QGridLayout, QSpacerItem, QProgressBar
+    QTableView, QMessageBox, QSizePolicy, QGridLayout, QSpacerItem, QProgressBar, QLineEdit,
+    QListWidget, QListWidgetItem, QListView
 )
 from PyQt5.QtCore import Qt, pyqtSignal, QTimer, QSize
-from PyQt5.QtGui import QFont, QIcon, QImage, QPixmap, QStandardItemModel, QStandardItem
-import cv2
-import numpy as np
+from PyQt5.QtGui import QFont, QIcon, QPixmap, QPen, QColor
 
 from styles import STYLE
-from image_utils import extract_face
 from recognition import compare_faces
-from database import get_all_photos, get_person_by_id, get_all_persons, delete_person, get_photos_by_person
+from database import (get_person_by_id, delete_person, get_photo_ids_by_person, count_photos_by_person,
+                      close_connections)
+from log_writer import recognition_log_writer
+from model_saver import model_saver
+from camera_manager import camera_manager
+from video_pipeline import RecognitionWorker
+from person_table_model import PersonTableModel
+from enrollment import CameraEnrollmentWorker, FileEnrollmentWorker
+from thumbnails import PixmapCache, ThumbnailLoader, THUMBNAIL_SIZE
+from video_widget import VideoWidget
 
-
-class CameraManager:
-    """Менеджер для управления камерой"""
-
-    _instance = None
-    _camera = None
-    _timer = None
-    _is_running = False
-    _current_user = None
-
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(CameraManager, cls).__new__(cls)
-        return cls._instance
-
-    def start_camera(self, user_id):
-        """Запускает камеру для конкретного пользователя"""
-        # Если камера уже запущена для другого пользователя, останавливаем её
-        if self._current_user is not None and self._current_user != user_id:
-            self.stop_camera()
-
-        # Если камера не запущена, запускаем
-        if not self._is_running:
-            self._camera = cv2.VideoCapture(0, cv2.CAP_DSHOW)
-            if not self._camera.isOpened():
-                print("Ошибка: не удалось открыть камеру")
-                return False
-            self._is_running = True
-
-        self._current_user = user_id
-        return True
-
-    def stop_camera(self, user_id=None):
-        """Останавливает камеру"""
-        # Если указан user_id, останавливаем только если это текущий пользователь
-        if user_id is not None and self._current_user != user_id:
-            return
-
-        if self._is_running and self._camera is not None:
-            if self._camera.isOpened():
-                self._camera.release()
-            self._camera = None
-            self._is_running = False
-            self._current_user = None
-
-    def is_camera_available(self, user_id):
-        """Проверяет, доступна ли камера для пользователя"""
-        return self._is_running and self._current_user == user_id
-
-    def get_frame(self):
-        """Получает текущий кадр с камеры"""
-        if not self._is_running or self._camera is None:
-            return None
-
-        ret, frame = self._camera.read()
-        if not ret:
-            return None
-        return frame
-
-    def is_opened(self):
-        """Проверяет, открыта ли камера"""
-        return self._is_running and self._camera is not None and self._camera.isOpened()
+STRIP_ICON_SIZE = 96  # Размер миниатюр в ленте фото пользователя
 
 
 class NavigationButton(QPushButton):
@@ -98,8 +44,8 @@ class MainWindow(QMainWindow):
         self.setMinimumSize(1500, 1000)
         self.setStyleSheet(STYLE)
 
-        # Создаем менеджер камеры
-        self.camera_manager = CameraManager()
+        # Общий сервис камеры для всех страниц
+        self.camera_manager = camera_manager
 
         # Центральный виджет
         central_widget = QWidget()
@@ -276,8 +222,27 @@ class MainWindow(QMainWindow):
 
     def closeEvent(self, event):
         """Обработка закрытия окна"""
-        # Останавливаем все камеры
+        # Останавливаем потоки распознавания и съемки до освобождения камеры
+        if hasattr(self, 'recognition_widget'):
+            self.recognition_widget.stop_camera()
+        if hasattr(self, 'add_person_widget'):
+            self.add_person_widget.stop_camera()
+
+        # Дожидаемся записи в базу фото, добавляемых в фоне
+        if hasattr(self, 'add_person_widget'):
+            self.add_person_widget.wait_workers()
+
+        # Останавливаем все камеры и загрузку миниатюр
         self.camera_manager.stop_camera()
+        if hasattr(self, 'database_widget'):
+            self.database_widget.stop_loader()
+
+        # Дописываем изменения модели, еще не сохраненные в фоне
+        model_saver.stop()
+
+        # Дописываем накопленный журнал распознаваний и закрываем соединения с базой
+        recognition_log_writer.stop()
+        close_connections()
         super().closeEvent(event)
 
 class RecognitionWindow(QWidget):
@@ -289,20 +254,8 @@ class RecognitionWindow(QWidget):
         # Сохраняем ссылки
         self.camera_manager = camera_manager
         self.user_id = user_id
-        self.timer = None
-
-        # Импортируем необходимые модули
-        import cv2
-        import numpy as np
-        from image_utils import extract_face
-        from recognition_service import recognize_face
-        from database import get_person_by_id
-
-        self.cv2 = cv2
-        self.np = np
-        self.extract_face = extract_face
-        self.recognize_face = recognize_face
-        self.get_person_by_id = get_person_by_id
+        self.recognition_worker = None
+        self.last_faces = []  # Лица из последнего результата распознавания
 
         self.init_ui()
 
@@ -350,7 +303,8 @@ class RecognitionWindow(QWidget):
         video_container_layout = QVBoxLayout(video_container)
         video_container_layout.setContentsMargins(10, 10, 10, 10)
 
-        self.video = QLabel()
+        self.video = VideoWidget()
+        self.video.overlay = self.draw_faces
         self.video.setAlignment(Qt.AlignCenter)
         self.video.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.video.setMinimumSize(640, 480)
@@ -470,16 +424,23 @@ class RecognitionWindow(QWidget):
 
     def start_camera(self):
         """Запускает камеру"""
-        if not self.camera_manager.start_camera(self.user_id):
+        if self.recognition_worker is not None:
+            return True
+
+        # Захват и распознавание работают в отдельных потоках,
+        # GUI-поток только отображает кадры и результаты
+        frame_queue = self.camera_manager.subscribe(self.user_id)
+        if frame_queue is None:
             self.status_label.setText("Статус: Ошибка запуска камеры")
             self.info_box.setText(
                 "Ошибка: не удалось запустить камеру\n\nПроверьте подключение камеры и попробуйте снова.")
             return False
 
-        # Запускаем таймер для обновления кадров
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_frame)
-        self.timer.start(30)  # ~30 FPS
+        self.recognition_worker = RecognitionWorker(frame_queue)
+        self.recognition_worker.result_ready.connect(self.on_recognition_result)
+        self.recognition_worker.start()
+
+        self.camera_manager.frame_ready.connect(self.update_frame)
 
         self.camera_btn.setText("⏸ Остановить камеру")
         self.status_label.setText("Статус: Камера активна - наведите на лицо")
@@ -487,16 +448,16 @@ class RecognitionWindow(QWidget):
 
     def stop_camera(self):
         """Останавливает камеру"""
-        if self.timer:
-            self.timer.stop()
-            self.timer = None
-
-        self.camera_manager.stop_camera(self.user_id)
+        if self.recognition_worker:
+            self.camera_manager.frame_ready.disconnect(self.update_frame)
+            self.camera_manager.unsubscribe(self.user_id)
+            self.recognition_worker.stop()
+            self.recognition_worker = None
+        self.last_faces = []
         self.camera_btn.setText("▶ Запустить камеру")
 
         # Очищаем видео и показываем черный фон
-        self.video.clear()
-        self.video.setText("Камера остановлена")
+        self.video.clear_frame("Камера остановлена")
         self.video.setStyleSheet("""
             QLabel {
                 background-color: black;
@@ -518,55 +479,47 @@ class RecognitionWindow(QWidget):
 
     def toggle_camera(self):
         """Переключает состояние камеры"""
-        if self.timer and self.timer.isActive():
+        if self.recognition_worker is not None:
             self.stop_camera()
         else:
             self.start_camera()
 
-    def update_frame(self):
-        """Обновляет кадр с камеры и выполняет распознавание"""
-        # Проверяем, доступна ли камера
-        if not self.camera_manager.is_camera_available(self.user_id):
+    def update_frame(self, frame):
+        """Отображает кадр, полученный от сервиса камеры"""
+        if self.recognition_worker is None:
             return
 
-        # Получаем кадр
-        frame = self.camera_manager.get_frame()
-        if frame is None:
-            return
+        # Рамки лиц рисуются при отрисовке виджета (draw_faces)
+        self.video.set_frame(frame)
 
-        # Извлекаем лицо из кадра
-        face = self.extract_face(frame)
-
-        # Распознаем лицо если найдено
-        if face is not None:
-            # Используем новый сервис распознавания
-            result = self.recognize_face(face)
+    def draw_faces(self, painter, scale):
+        """Рисует рамки и подписи для лиц из последнего результата распознавания поверх кадра"""
+        if not self.last_faces:
+            return
 
-            # Получаем информацию о распознанном человеке
-            if result['recognized'] and result['person_id'] is not None:
-                recognized_person = self.get_person_by_id(result['person_id'])
-                self.update_person_info(recognized_person, result['similarity'])
+        painter.setFont(QFont("Arial", 10, QFont.Bold))
+        for face in self.last_faces:
+            x, y, w, h = (int(v * scale) for v in face['box'])
+            person = face['person']
+            if person is not None:
+                color = QColor("#27ae60")
+                caption = f"{person[1]} {person[2]} ({face['similarity']:.0f}%)"
             else:
-                self.update_person_info(None, result['similarity'])
-        else:
-            self.update_person_info(None, 0)
-
-        # Отображение видео
-        rgb = self.cv2.cvtColor(frame, self.cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb.shape
-        img = QImage(rgb.data, w, h, ch * w, QImage.Format_RGB888)
-        pixmap = QPixmap.fromImage(img)
-
-        # Масштабируем изображение под размер контейнера
-        scaled_pixmap = pixmap.scaled(
-            self.video.size(),
-            Qt.KeepAspectRatio,
-            Qt.SmoothTransformation
-        )
+                color = QColor("#e74c3c")
+                caption = f"Неизвестный ({face['similarity']:.0f}%)"
 
-        # Устанавливаем пиксмап
-        self.video.setPixmap(scaled_pixmap)
-        self.video.setAlignment(Qt.AlignCenter)
+            painter.setPen(QPen(color, 2))
+            painter.drawRect(x, y, w, h)
+            painter.drawText(x, max(12, y - 5), caption)
+
+    def on_recognition_result(self, result):
+        """Принимает результат от потока распознавания"""
+        if self.recognition_worker is None:
+            return
+        self.last_faces = result['faces']
+        self.update_person_info(result['person'], result['similarity'])
+        if len(self.last_faces) > 1:
+            self.status_label.setText(f"{self.status_label.text()} | Лиц в кадре: {len(self.last_faces)}")
 
     def update_person_info(self, person, similarity):
         """Обновляет информацию о распознанном человеке"""
@@ -625,6 +578,15 @@ class DatabaseWindow(QWidget):
 
     def __init__(self):
         super().__init__()
+
+        # Миниатюры читаются в фоновом потоке, готовые QPixmap хранятся в LRU-кэше
+        self.pixmap_cache = PixmapCache()
+        self.thumbnail_loader = ThumbnailLoader(self)
+        self.thumbnail_loader.thumbnail_ready.connect(self.on_thumbnail_ready)
+        self.thumbnail_loader.start()
+        self.strip_items = {}  # photo_id -> элемент ленты
+        self.preview_photo_id = None
+
         self.init_ui()
 
     def init_ui(self):
@@ -657,13 +619,25 @@ class DatabaseWindow(QWidget):
         table_title.setAlignment(Qt.AlignCenter)
         left_layout.addWidget(table_title)
 
-        # Создаем таблицу
+        # Поиск выполняется в базе после паузы в наборе текста
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("🔍 Поиск по имени, фамилии или группе")
+        self.search_edit.setMinimumHeight(36)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(300)
+        self.search_timer.timeout.connect(self.apply_search)
+        self.search_edit.textChanged.connect(self.search_timer.start)
+        left_layout.addWidget(self.search_edit)
+
+        # Создаем таблицу (строки подгружаются из базы по мере прокрутки)
         self.table = QTableView()
-        self.model = QStandardItemModel(0, 4)
-        self.model.setHorizontalHeaderLabels(["ID", "Имя", "Фамилия", "Группа"])
+        self.model = PersonTableModel(parent=self)
 
         # Настройки таблицы
         self.table.setModel(self.model)
+        self.table.horizontalHeader().setSortIndicator(0, Qt.AscendingOrder)
+        self.table.setSortingEnabled(True)
         self.table.setSelectionBehavior(QTableView.SelectRows)
         self.table.setSelectionMode(QTableView.SingleSelection)
         self.table.setEditTriggers(QTableView.NoEditTriggers)
@@ -771,6 +745,18 @@ class DatabaseWindow(QWidget):
         photo_container_layout.addWidget(self.photo_container)
         right_layout.addWidget(photo_container_frame)
 
+        # Лента миниатюр всех фото пользователя
+        self.photo_strip = QListWidget()
+        self.photo_strip.setViewMode(QListView.IconMode)
+        self.photo_strip.setFlow(QListView.LeftToRight)
+        self.photo_strip.setWrapping(False)
+        self.photo_strip.setMovement(QListView.Static)
+        self.photo_strip.setUniformItemSizes(True)
+        self.photo_strip.setIconSize(QSize(STRIP_ICON_SIZE, STRIP_ICON_SIZE))
+        self.photo_strip.setFixedHeight(STRIP_ICON_SIZE + 30)
+        self.photo_strip.currentItemChanged.connect(self.on_strip_item_changed)
+        right_layout.addWidget(self.photo_strip)
+
         # Информация о выбранном пользователе
         self.user_info_label = QLabel("Информация не выбрана")
         self.user_info_label.setAlignment(Qt.AlignCenter)
@@ -812,24 +798,14 @@ class DatabaseWindow(QWidget):
     def load(self):
         """Загружает данные в таблицу"""
         try:
-            # Удаляем старые данные
-            self.model.removeRows(0, self.model.rowCount())
-
-            # Получаем данные
-            persons = get_all_persons()
-
-            # Заполняем таблицу
-            for p in persons:
-                self.model.appendRow([
-                    QStandardItem(str(p[0])),
-                    QStandardItem(p[1]),
-                    QStandardItem(p[2]),
-                    QStandardItem(p[3])
-                ])
+            # Загружается только первая страница, остальные - при прокрутке
+            self.model.refresh()
 
             # Обновляем статус
+            more = "+" if self.model.canFetchMore() else ""
             self.status_label.setText(
-                f"✓ Загружено записей: {len(persons)} | Последнее обновление: {self.get_current_time()}")
+                f"✓ Загружено записей: {self.model.rowCount()}{more} | "
+                f"Последнее обновление: {self.get_current_time()}")
 
         except Exception as e:
             self.status_label.setText(f"✗ Ошибка загрузки: {str(e)}")
@@ -844,14 +820,13 @@ class DatabaseWindow(QWidget):
         if not idx.isValid():
             return None
 
-        # Получаем ID из первого столбца выбранной строки
-        item = self.model.item(idx.row(), 0)
-        if item:
-            try:
-                return int(item.text())
-            except:
-                return None
-        return None
+        return self.model.person_id(idx.row())
+
+    def apply_search(self):
+        """Применяет строку поиска к таблице"""
+        self.model.set_search(self.search_edit.text())
+        self.table.clearSelection()
+        self.btn_delete.setEnabled(False)
 
     def remove(self):
         pid = self.current_person_id()
@@ -867,7 +842,14 @@ class DatabaseWindow(QWidget):
 
         if reply == QMessageBox.Yes:
             try:
+                for photo_id in self.strip_items:
+                    self.pixmap_cache.discard_photo(photo_id)
+                self.fill_photo_strip([])
+                self.preview_photo_id = None
+
                 delete_person(pid)
+                # Файл модели перезаписывается в фоне, серия удалений дает одну запись
+                model_saver.request()
                 self.load()
                 self.photo_container.setText("Пользователь удален")
                 self.photo_container.setPixmap(QPixmap())
@@ -887,60 +869,87 @@ class DatabaseWindow(QWidget):
         self.btn_delete.setEnabled(True)
 
         try:
-            photos = get_photos_by_person(pid)
+            # Изображения не читаются: только ID фото, миниатюры загрузит фоновый поток
+            photo_ids = get_photo_ids_by_person(pid)
+            self.fill_photo_strip(photo_ids)
+
+            # Получаем информацию о пользователе
+            person = get_person_by_id(pid)
+            if person:
+                self.user_info_label.setText(
+                    f"👤 {person[1]} {person[2]}\n"
+                    f"🎓 Группа: {person[3]}\n"
+                    f"📝 Описание: {person[4] or 'не указано'}\n"
+                    f"🔢 ID: {pid}\n"
+                    f"📸 Фотографий: {count_photos_by_person(pid)}"
+                )
 
-            if not photos:
+            if not photo_ids:
+                self.preview_photo_id = None
                 self.photo_container.setText("Нет фотографий")
                 self.photo_container.setPixmap(QPixmap())
-                # Получаем информацию о пользователе
-                from database import get_person_by_id
-                person = get_person_by_id(pid)
-                if person:
-                    self.user_info_label.setText(
-                        f"👤 {person[1]} {person[2]}\n"
-                        f"🎓 Группа: {person[3]}\n"
-                        f"📝 Описание: {person[4] or 'не указано'}\n"
-                        f"🔢 ID: {pid}"
-                    )
                 return
 
             # Показываем первую фотографию
-            blob = photos[0][1]
-            img = cv2.imdecode(np.frombuffer(blob, np.uint8), cv2.IMREAD_COLOR)
-
-            if img is not None:
-                rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                h, w, ch = rgb.shape
-                qimg = QImage(rgb.data, w, h, ch * w, QImage.Format_RGB888)
-                pixmap = QPixmap.fromImage(qimg)
-
-                # Масштабируем по размеру контейнера
-                scaled_pixmap = pixmap.scaled(
-                    self.photo_container.size().width() - 40,
-                    self.photo_container.size().height() - 40,
-                    Qt.KeepAspectRatio,
-                    Qt.SmoothTransformation
-                )
-                self.photo_container.setPixmap(scaled_pixmap)
-                self.photo_container.setText("")
-
-                # Получаем информацию о пользователе
-                from database import get_person_by_id
-                person = get_person_by_id(pid)
-                if person:
-                    self.user_info_label.setText(
-                        f"👤 {person[1]} {person[2]}\n"
-                        f"🎓 Группа: {person[3]}\n"
-                        f"📝 Описание: {person[4] or 'не указано'}\n"
-                        f"🔢 ID: {pid}\n"
-                        f"📸 Фотографий: {len(photos)}"
-                    )
-            else:
-                self.photo_container.setText("Ошибка загрузки изображения")
-                self.photo_container.setPixmap(QPixmap())
+            self.photo_strip.setCurrentRow(0)
         except Exception as e:
             self.photo_container.setText(f"Ошибка: {str(e)}")
 
+    def fill_photo_strip(self, photo_ids):
+        """Заполняет ленту фото: готовые миниатюры из кэша, остальные - в очередь загрузки"""
+        self.thumbnail_loader.cancel_all()
+        self.photo_strip.clear()
+        self.strip_items = {}
+
+        for photo_id in photo_ids:
+            item = QListWidgetItem()
+            item.setData(Qt.UserRole, photo_id)
+            item.setSizeHint(QSize(STRIP_ICON_SIZE + 8, STRIP_ICON_SIZE + 8))
+            self.photo_strip.addItem(item)
+            self.strip_items[photo_id] = item
+
+            pixmap = self.pixmap_cache.get((photo_id, STRIP_ICON_SIZE))
+            if pixmap is not None:
+                item.setIcon(QIcon(pixmap))
+        # Запросы обрабатываются с конца, поэтому ставим их в обратном порядке
+        for photo_id in reversed(photo_ids):
+            if self.pixmap_cache.get((photo_id, STRIP_ICON_SIZE)) is None:
+                self.thumbnail_loader.request(photo_id, STRIP_ICON_SIZE)
+
+    def on_strip_item_changed(self, item, previous=None):
+        """Показывает выбранное в ленте фото"""
+        if item is None:
+            return
+        self.show_preview(item.data(Qt.UserRole))
+
+    def show_preview(self, photo_id):
+        self.preview_photo_id = photo_id
+        pixmap = self.pixmap_cache.get((photo_id, THUMBNAIL_SIZE))
+        if pixmap is not None:
+            self.set_preview(pixmap)
+        else:
+            self.photo_container.setPixmap(QPixmap())
+            self.photo_container.setText("Загрузка...")
+            self.thumbnail_loader.request(photo_id, THUMBNAIL_SIZE)
+
+    def set_preview(self, pixmap):
+        self.photo_container.setPixmap(pixmap)
+        self.photo_container.setText("")
+
+    def on_thumbnail_ready(self, photo_id, size, image):
+        """Принимает миниатюру из фонового потока"""
+        pixmap = QPixmap.fromImage(image)
+        self.pixmap_cache.put((photo_id, size), pixmap)
+
+        if size == STRIP_ICON_SIZE and photo_id in self.strip_items:
+            self.strip_items[photo_id].setIcon(QIcon(pixmap))
+        if size == THUMBNAIL_SIZE and photo_id == self.preview_photo_id:
+            self.set_preview(pixmap)
+
+    def stop_loader(self):
+        """Останавливает поток загрузки миниатюр"""
+        self.thumbnail_loader.stop()
+
 
 class AddPersonWindow(QWidget):
     """Виджет добавления нового человека"""
@@ -955,22 +964,19 @@ class AddPersonWindow(QWidget):
         # Импортируем здесь, чтобы избежать циклических импортов
         from PyQt5.QtWidgets import QLineEdit, QFileDialog, QProgressBar, QStackedWidget
         from person_service import add_person as add_person_service
-        from image_utils import image_to_bytes
-        from database import add_photo
 
         self.QLineEdit = QLineEdit
         self.QFileDialog = QFileDialog
         self.QProgressBar = QProgressBar
         self.QStackedWidget = QStackedWidget
         self.add_person_service = add_person_service
-        self.image_to_bytes = image_to_bytes
-        self.add_photo = add_photo
 
         # Инициализируем переменные
         self.person_created = False
         self.person_id = None
-        self.capture_timer = None
-        self.preview_timer = None
+        self.capture_worker = None  # Фоновая съемка (детекция, кодирование, запись в базу)
+        self.file_worker = None  # Фоновая загрузка из файлов
+        self.preview_active = False
         self.photos_captured = 0
         self.total_photos_to_capture = 200
         self.is_capturing = False
@@ -1090,7 +1096,7 @@ class AddPersonWindow(QWidget):
         layout.addWidget(title)
 
         # Видео с камеры - ФИКСИРОВАННЫЙ размер
-        self.camera_display = QLabel("Запуск камеры...")
+        self.camera_display = VideoWidget("Запуск камеры...")
         self.camera_display.setAlignment(Qt.AlignCenter)
         self.camera_display.setFixedSize(640, 480)  # ФИКСИРОВАННЫЙ размер
         self.camera_display.setStyleSheet("""
@@ -1141,8 +1147,8 @@ class AddPersonWindow(QWidget):
         # Создаем человека если еще не создан
         self.create_person_once()
 
-        # Запускаем камеру
-        if not self.camera_manager.start_camera(self.user_id):
+        # Подписываемся на общий сервис камеры
+        if self.camera_manager.subscribe(self.user_id) is None:
             self.info_label.setText("⚠️ Не удалось запустить камеру")
             return
 
@@ -1154,28 +1160,56 @@ class AddPersonWindow(QWidget):
         self.start_capture()
 
     def stop_camera_mode(self):
-        """Выходит из режима камеры"""
+        """Кнопка остановки: поток съемки сохраняет снятые фото и сообщает о завершении сам"""
+        if self.stacked_widget.currentWidget() is not self.camera_widget:
+            return
+
         self.stop_capture()
-        self.camera_manager.stop_camera(self.user_id)
+        self.camera_manager.unsubscribe(self.user_id)
+        if self.capture_worker and self.capture_worker.isRunning():
+            # Окно переключится по сигналу finished_enrollment после записи в базу
+            self.btn_stop_camera.setEnabled(False)
+            self.btn_stop_camera.setText("Сохранение фото...")
+        else:
+            self.finish_camera_mode()
 
-        # Переключаемся обратно в режим ввода
+    def finish_camera_mode(self):
+        """Освобождает камеру и возвращает окно в режим ввода"""
+        self.stop_capture()
+        self.camera_manager.unsubscribe(self.user_id)
+        self.btn_stop_camera.setEnabled(True)
+        self.btn_stop_camera.setText("⏹️ Остановить запись и вернуться")
         self.stacked_widget.setCurrentWidget(self.input_widget)
 
-        if self.photos_captured > 0:
+    def on_capture_finished(self, count):
+        """Поток съемки записал фото в базу (сигнал приходит после записи)"""
+        if self.sender() is not self.capture_worker:
+            return
+        self.photos_captured = count
+        was_capturing = self.stacked_widget.currentWidget() is self.camera_widget
+        self.finish_camera_mode()
+
+        # Новые фото уже добавлены в модель, файл модели перезаписывается в фоне
+        model_saver.request()
+
+        if was_capturing and count > 0:
             QMessageBox.information(
                 self,
                 "Съемка завершена",
-                f"✅ Съемка завершена!\n\nСохранено фото: {self.photos_captured}"
+                f"✅ Съемка завершена!\n\nСохранено фото: {count}"
             )
 
+    def on_capture_failed(self, message):
+        if self.sender() is not self.capture_worker:
+            return
+        self.finish_camera_mode()
+        QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить фото: {message}")
+
     def start_preview(self):
         """Запускает предпросмотр камеры"""
-        if self.preview_timer:
-            self.preview_timer.stop()
-
-        self.preview_timer = QTimer()
-        self.preview_timer.timeout.connect(self.update_preview)
-        self.preview_timer.start(30)  # ~30 FPS
+        if not self.preview_active:
+            self.camera_manager.frame_ready.connect(self.update_preview)
+            self.preview_active = True
 
     def start_capture(self):
         """Запускает автоматическую съемку"""
@@ -1183,86 +1217,50 @@ class AddPersonWindow(QWidget):
         self.is_capturing = True
         self.progress_bar.setValue(0)
 
-        # ЗАПУСКАЕМ ТАЙМЕР ДЛЯ СЪЕМКИ
-        if self.capture_timer:
-            self.capture_timer.stop()
-
-        self.capture_timer = QTimer()
-        self.capture_timer.timeout.connect(self.capture_single_photo)
-        self.capture_timer.start(100)  # 1 фото каждые 100мс
-
-    def update_preview(self):
-        """Обновляет изображение с камеры - ФИКСИРОВАННЫЙ размер"""
-        if not self.camera_manager.is_camera_available(self.user_id):
-            return
-
-        frame = self.camera_manager.get_frame()
-        if frame is None:
-            return
-
-        # Фиксируем размер для отображения
-        target_width = 640
-        target_height = 480
-
-        # Конвертируем кадр для отображения
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-        # Изменяем размер изображения до фиксированного
-        rgb_resized = cv2.resize(rgb, (target_width, target_height))
+        if self.capture_worker:
+            self.capture_worker.stop()
 
-        h, w, ch = rgb_resized.shape
-
-        # Создаем QImage с фиксированным размером
-        img = QImage(rgb_resized.data, w, h, ch * w, QImage.Format_RGB888)
-
-        # Создаем пиксмап фиксированного размера
-        pixmap = QPixmap.fromImage(img)
-
-        # Устанавливаем пиксмап
-        self.camera_display.setPixmap(pixmap)
-
-    def capture_single_photo(self):
-        """Захватывает одно фото"""
-        if self.photos_captured >= self.total_photos_to_capture:
-            self.stop_camera_mode()
-            return
-
-        # Получаем кадр с камеры
-        frame = self.camera_manager.get_frame()
-        if frame is None:
+        # Детекция, кодирование и запись в базу идут в фоновом потоке,
+        # GUI получает только прогресс и сигнал завершения
+        self.capture_worker = CameraEnrollmentWorker(
+            self.person_id, self.camera_manager, self.total_photos_to_capture
+        )
+        self.capture_worker.progress.connect(self.on_capture_progress)
+        self.capture_worker.finished_enrollment.connect(self.on_capture_finished)
+        self.capture_worker.failed.connect(self.on_capture_failed)
+        self.capture_worker.start()
+
+    def update_preview(self, frame):
+        """Обновляет изображение с камеры"""
+        if not self.camera_manager.is_subscribed(self.user_id):
             return
 
-        # Извлекаем лицо
-        face = extract_face(frame)
-        if face is not None:
-            # Сохраняем фото
-            data = self.image_to_bytes(face)
-            self.add_photo(self.person_id, f"auto_capture_{self.photos_captured}", "jpg", len(data), data)
-
-            self.photos_captured += 1
-            self.progress_bar.setValue(self.photos_captured)
+        self.camera_display.set_frame(frame)
 
-        # Если достигли лимита - останавливаем
-        if self.photos_captured >= self.total_photos_to_capture:
-            self.stop_camera_mode()
+    def on_capture_progress(self, done, total):
+        """Прогресс фоновой съемки"""
+        self.photos_captured = done
+        self.progress_bar.setValue(done)
 
     def stop_capture(self):
-        """Останавливает съемку"""
+        """Останавливает съемку, не дожидаясь записи фото в базу"""
         self.is_capturing = False
 
-        if self.capture_timer:
-            self.capture_timer.stop()
-            self.capture_timer = None
+        if self.capture_worker:
+            self.capture_worker.request_stop()
 
-        if self.preview_timer:
-            self.preview_timer.stop()
-            self.preview_timer = None
+        if self.preview_active:
+            self.camera_manager.frame_ready.disconnect(self.update_preview)
+            self.preview_active = False
 
     def from_files(self):
         """Добавление фото из файлов"""
         if not self.validate_fields():
             return
 
+        if self.file_worker and self.file_worker.isRunning():
+            return
+
         pid = self.create_person_once()
         files, _ = self.QFileDialog.getOpenFileNames(
             self,
@@ -1274,19 +1272,20 @@ class AddPersonWindow(QWidget):
         if not files:
             return
 
-        count = 0
-        for f in files:
-            img = cv2.imread(f)
-            if img is None:
-                continue
+        # Файлы обрабатываются в фоне, окно остается отзывчивым
+        self.file_worker = FileEnrollmentWorker(pid, files)
+        self.file_worker.progress.connect(self.on_files_progress)
+        self.file_worker.finished_enrollment.connect(self.on_files_added)
+        self.file_worker.failed.connect(self.on_files_failed)
+        self.file_worker.start()
 
-            face = extract_face(img)
-            if face is None:
-                continue
+    def on_files_progress(self, done, total):
+        self.info_label.setText(f"Обработка изображений: {done}/{total}")
 
-            data = self.image_to_bytes(face)
-            self.add_photo(pid, f, "jpg", len(data), data)
-            count += 1
+    def on_files_added(self, count):
+        """Все фото из файлов сохранены"""
+        # Файл модели перезаписывается в фоне
+        model_saver.request()
 
         QMessageBox.information(
             self,
@@ -1296,6 +1295,9 @@ class AddPersonWindow(QWidget):
 
         self.info_label.setText(f"Последнее действие: загружено {count} фото")
 
+    def on_files_failed(self, message):
+        QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить фото: {message}")
+
     def create_person_once(self):
         """Создаёт человека только один раз"""
         if not self.person_created:
@@ -1326,4 +1328,11 @@ class AddPersonWindow(QWidget):
     def stop_camera(self):
         """Метод для MainWindow - останавливает камеру при уходе с этой страницы"""
         self.stop_capture()
-        self.camera_manager.stop_camera(self.user_id)
\ No newline at end of file
+        self.camera_manager.unsubscribe(self.user_id)
+
+    def wait_workers(self):
+        """Дожидается записи в базу фото, которые сохраняются в фоне (при закрытии окна)"""
+        if self.capture_worker:
+            self.capture_worker.stop()
+        if self.file_worker:
+            self.file_worker.wait()
\ No newline at end of file
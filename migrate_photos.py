@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Перенос фотографий из колонки photos.image_data в файловое хранилище photo_store
+
+    python migrate_photos.py               - BLOB из базы -> файлы, в базе остается хэш
+    python migrate_photos.py --to-database - обратный перенос файлов в базу
+
+После переноса база сжимается (VACUUM). Чтобы новые фото тоже сохранялись
+в файлы, установите database.PHOTO_STORAGE = "files".
+"""
+import sys
+import os
+import argparse
+
+# Добавляем текущую директорию в путь для импортов
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import init_db, connect
+from photo_store import photo_store
+
+BATCH_SIZE = 100  # Фото за одну транзакцию
+
+
+def migrate_to_files():
+    """Переносит BLOB фотографий в файлы, возвращает число перенесенных фото"""
+    moved = 0
+    last_id = 0
+
+    with connect() as conn:
+        cur = conn.cursor()
+        while True:
+            cur.execute(
+                "SELECT photo_id, image_data FROM photos "
+                "WHERE image_hash IS NULL AND photo_id > ? ORDER BY photo_id LIMIT ?",
+                (last_id, BATCH_SIZE)
+            )
+            rows = cur.fetchall()
+            if not rows:
+                break
+
+            for photo_id, image_data in rows:
+                image_hash = photo_store.put(image_data)
+                cur.execute(
+                    "UPDATE photos SET image_hash=?, image_data=NULL WHERE photo_id=?",
+                    (image_hash, photo_id)
+                )
+            conn.commit()
+
+            last_id = rows[-1][0]
+            moved += len(rows)
+            print(f"  Перенесено {moved} фото")
+
+    return moved
+
+
+def migrate_to_database():
+    """Возвращает фото из файлов в базу, возвращает число перенесенных фото"""
+    moved = 0
+    last_id = 0
+    image_hashes = set()
+
+    with connect() as conn:
+        cur = conn.cursor()
+        while True:
+            cur.execute(
+                "SELECT photo_id, image_hash FROM photos "
+                "WHERE image_hash IS NOT NULL AND photo_id > ? ORDER BY photo_id LIMIT ?",
+                (last_id, BATCH_SIZE)
+            )
+            rows = cur.fetchall()
+            if not rows:
+                break
+
+            for photo_id, image_hash in rows:
+                try:
+                    with open(photo_store.path_for(image_hash), "rb") as f:
+                        data = f.read()
+                except FileNotFoundError:
+                    print(f"  Ошибка: файл фото {photo_id} не найден, пропускаю")
+                    continue
+                cur.execute(
+                    "UPDATE photos SET image_data=?, image_hash=NULL WHERE photo_id=?",
+                    (data, photo_id)
+                )
+                image_hashes.add(image_hash)
+                moved += 1
+            conn.commit()
+
+            last_id = rows[-1][0]
+            print(f"  Перенесено {moved} фото")
+
+    # Файлы удаляем только после того, как все байты оказались в базе
+    for image_hash in image_hashes:
+        photo_store.delete(image_hash)
+
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Перенос фотографий между базой и файловым хранилищем")
+    parser.add_argument("--to-database", action="store_true", help="вернуть фото из файлов в базу")
+    args = parser.parse_args()
+
+    init_db()
+
+    if args.to_database:
+        print("Перенос фото из файлов в базу...")
+        moved = migrate_to_database()
+    else:
+        print(f"Перенос фото из базы в {photo_store.root}...")
+        moved = migrate_to_files()
+
+    print("Сжатие базы...")
+    with connect() as conn:
+        conn.execute("VACUUM")
+
+    print(f"Готово, перенесено фото: {moved}")
+
+
+if __name__ == "__main__":
+    main()
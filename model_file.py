@@ -0,0 +1,156 @@
+"""
+Двоичный формат файла модели распознавания.
+
+Структура файла:
+    префикс: сигнатура MODEL_MAGIC, версия формата, длина JSON, CRC32 JSON
+        и меток, CRC32 гистограмм
+    JSON (utf-8): параметры, версия признаков, метки и имена людей, число и
+        размерность гистограмм; дополняется пробелами до границы MODEL_ALIGN байт
+    гистограммы: float32 (count, dim), построчно, отсортированы по метке
+    метки образцов: int32 (count)
+
+Гистограммы при чтении не копируются, а отображаются из файла через
+np.memmap. При загрузке проверяется только контрольная сумма JSON и меток,
+поэтому она почти не зависит от размера галереи; гистограммы проверяются
+по запросу (verify_model, read_model(verify_histograms=True)). Файл пишется
+во временный файл рядом и заменяет прежний через os.replace: при сбое
+на диске остается предыдущая целая модель.
+"""
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+
+MODEL_MAGIC = b"FACEMDL\0"
+MODEL_FORMAT_VERSION = 2
+MODEL_ALIGN = 64  # Выравнивание начала гистограмм в файле
+WRITE_CHUNK_ROWS = 1024  # Гистограмм в одном блоке записи
+
+_PREFIX = struct.Struct("<8sIIII")  # сигнатура, версия формата, длина JSON, CRC32 JSON и меток, CRC32 гистограмм
+
+
+def write_model(filename, header, histograms, labels):
+    """
+    Атомарно записывает модель
+
+    Args:
+        header: словарь, сериализуемый в JSON (count и dim добавляются сами)
+        histograms: матрица (N, dim) float32
+        labels: метки образцов (N)
+    """
+    labels = np.asarray(labels, dtype=np.int32).ravel()
+    histograms = np.asarray(histograms, dtype=np.float32).reshape(len(labels), -1)
+
+    header = dict(header, count=len(labels), dim=histograms.shape[1])
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    padding = -(_PREFIX.size + len(header_bytes)) % MODEL_ALIGN
+    header_bytes += b" " * padding
+
+    # Образцы одного человека пишутся подряд: при загрузке галерее не нужно их переставлять
+    order = np.argsort(labels, kind="stable")
+
+    temp_file = filename + ".tmp"
+    try:
+        with open(temp_file, "wb") as f:
+            f.write(_PREFIX.pack(MODEL_MAGIC, MODEL_FORMAT_VERSION, len(header_bytes), 0, 0))
+            f.write(header_bytes)
+
+            histograms_checksum = 0
+            for start in range(0, len(order), WRITE_CHUNK_ROWS):
+                block = np.ascontiguousarray(histograms[order[start:start + WRITE_CHUNK_ROWS]], dtype="<f4")
+                histograms_checksum = zlib.crc32(block, histograms_checksum)
+                f.write(block)
+
+            sorted_labels = np.ascontiguousarray(labels[order], dtype="<i4")
+            f.write(sorted_labels)
+            meta_checksum = zlib.crc32(sorted_labels, zlib.crc32(header_bytes))
+
+            f.seek(0)
+            f.write(_PREFIX.pack(MODEL_MAGIC, MODEL_FORMAT_VERSION, len(header_bytes),
+                                 meta_checksum, histograms_checksum))
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(temp_file, filename)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+
+
+def read_model(filename, verify_histograms=False):
+    """
+    Читает модель, гистограммы отображаются из файла без копирования
+
+    Контрольная сумма JSON и меток проверяется всегда, гистограмм - только
+    при verify_histograms=True (чтение всего файла).
+
+    Returns:
+        (header, histograms, labels): словарь JSON, np.memmap (count, dim) только
+        для чтения и массив меток int32
+
+    Raises:
+        ValueError: файл не является моделью, поврежден или другой версии формата
+    """
+    file_size = os.path.getsize(filename)
+    with open(filename, "rb") as f:
+        prefix = f.read(_PREFIX.size)
+        if len(prefix) < _PREFIX.size:
+            raise ValueError("файл модели обрезан")
+        magic, version, header_size, meta_checksum, histograms_checksum = _PREFIX.unpack(prefix)
+        if magic != MODEL_MAGIC:
+            raise ValueError("файл не является моделью распознавания")
+        if version != MODEL_FORMAT_VERSION:
+            raise ValueError(f"неподдерживаемая версия формата модели: {version}")
+        header_bytes = f.read(header_size)
+
+    header = json.loads(header_bytes.decode("utf-8"))
+    count, dim = _header_shape(header)
+    offset = _PREFIX.size + header_size
+    labels_offset = offset + count * dim * 4
+    if len(header_bytes) != header_size or file_size != labels_offset + count * 4:
+        raise ValueError("размер файла модели не совпадает с заголовком")
+
+    if count == 0:
+        histograms = np.empty((0, dim), dtype=np.float32)
+        labels = np.empty(0, dtype=np.int32)
+    else:
+        histograms = np.memmap(filename, dtype="<f4", mode="r", offset=offset, shape=(count, dim))
+        labels = np.array(np.memmap(filename, dtype="<i4", mode="r", offset=labels_offset, shape=(count,)),
+                          dtype=np.int32)
+
+    if zlib.crc32(labels.astype("<i4", copy=False), zlib.crc32(header_bytes)) != meta_checksum:
+        raise ValueError("контрольная сумма заголовка модели не совпадает")
+
+    if verify_histograms:
+        if zlib.crc32(histograms) != histograms_checksum:
+            raise ValueError("контрольная сумма гистограмм модели не совпадает")
+
+    return header, histograms, labels
+
+
+def _header_shape(header):
+    """Число и размерность гистограмм из заголовка; до проверки CRC заголовку нельзя доверять"""
+    if not isinstance(header, dict):
+        raise ValueError("заголовок модели поврежден")
+    count, dim = header.get("count"), header.get("dim")
+    for value, minimum in ((count, 0), (dim, 1)):
+        if not isinstance(value, int) or isinstance(value, bool) or value < minimum:
+            raise ValueError("заголовок модели поврежден")
+    return count, dim
+
+
+def verify_model(filename):
+    """
+    Полная проверка файла модели, включая гистограммы
+
+    Returns:
+        (bool, str): результат и описание ошибки (пустое, если файл цел)
+    """
+    try:
+        read_model(filename, verify_histograms=True)
+        return True, ""
+    except (OSError, ValueError) as e:
+        return False, str(e)
@@ -0,0 +1,68 @@
+"""
+Отложенное сохранение модели распознавания в фоновом потоке.
+
+Запись файла модели занимает время, пропорциональное размеру галереи, поэтому
+GUI не сохраняет модель сам после каждого изменения (удаление человека,
+добавление фото), а вызывает model_saver.request(). Модель записывается
+в фоновом потоке через MODEL_SAVE_DELAY секунд после последнего запроса:
+серия изменений подряд дает одну запись файла. При выходе stop() дописывает
+несохраненные изменения.
+"""
+import threading
+import time
+
+from recognition import face_recognizer
+
+MODEL_SAVE_DELAY = 5.0  # Секунд тишины после последнего изменения до записи файла
+
+
+class ModelSaver:
+    """Отложенное фоновое сохранение модели с объединением запросов"""
+
+    def __init__(self, recognizer, delay=MODEL_SAVE_DELAY):
+        self.recognizer = recognizer
+        self.delay = delay
+        self._cond = threading.Condition()
+        self._deadline = None  # Когда сохранить модель, если новых запросов не будет
+        self._stopping = False
+        self._thread = None
+
+    def request(self):
+        """Планирует сохранение модели (повторные запросы откладывают запись)"""
+        with self._cond:
+            self._deadline = time.monotonic() + self.delay
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="ModelSaver", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def stop(self):
+        """Останавливает поток и сохраняет несохраненные изменения (вызывается при выходе)"""
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._deadline = None
+            self._cond.notify()
+        if thread is not None:
+            thread.join()
+        self._save()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopping and (self._deadline is None or time.monotonic() < self._deadline):
+                    timeout = None if self._deadline is None else self._deadline - time.monotonic()
+                    self._cond.wait(timeout)
+                if self._stopping:
+                    return
+                self._deadline = None
+            self._save()
+
+    def _save(self):
+        if self.recognizer.is_dirty:
+            self.recognizer.save_model()
+
+
+# Глобальный экземпляр
+model_saver = ModelSaver(face_recognizer)
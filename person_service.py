@@ -1,6 +1,7 @@
 from database import *
 from image_utils import *
 from camera import capture_faces_from_camera
+from recognition_service import save_model_if_changed
 
 
 def add_person_from_files():
@@ -23,6 +24,8 @@ def add_person_from_files():
         name, fmt, size = get_file_info(p.strip())
         add_photo(pid, name, fmt, size, img_bytes)
 
+    save_model_if_changed()
+
 
 def add_person_from_camera():
     fn = input("Имя: ")
@@ -38,6 +41,8 @@ def add_person_from_camera():
         img_bytes = image_to_bytes(face)
         add_photo(pid, f"camera_{i+1}", "jpg", len(img_bytes), img_bytes)
 
+    save_model_if_changed()
+
 
 def edit_person():
     for p in get_all_persons():
@@ -51,10 +56,12 @@ def edit_person():
     grp = input(f"Группа [{p[3]}]: ") or p[3]
     desc = input(f"Описание [{p[4]}]: ") or p[4]
     update_person(pid, fn, ln, grp, desc)
+    save_model_if_changed()
 
 
 def remove_person():
     for p in get_all_persons():
         print(p)
     pid = int(input("ID для удаления: "))
-    delete_person(pid)
\ No newline at end of file
+    delete_person(pid)
+    save_model_if_changed()
\ No newline at end of file
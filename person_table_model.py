@@ -0,0 +1,91 @@
+"""
+Модель таблицы людей с подгрузкой страниц по требованию.
+
+QTableView запрашивает строки через canFetchMore/fetchMore по мере прокрутки,
+поэтому открытие страницы базы данных загружает только первую страницу
+независимо от числа людей. Поиск и сортировка выполняются запросом к SQLite.
+"""
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from database import get_persons_page, PERSON_SORT_COLUMNS
+
+PERSON_PAGE_SIZE = 200  # Строк в одной подгружаемой странице
+
+
+class PersonTableModel(QAbstractTableModel):
+    """Постраничная модель таблицы persons: ID, имя, фамилия, группа"""
+
+    HEADERS = ["ID", "Имя", "Фамилия", "Группа"]
+
+    def __init__(self, page_size=PERSON_PAGE_SIZE, parent=None):
+        super().__init__(parent)
+        self.page_size = page_size
+        self.rows = []
+        self.search = ""
+        self.sort_column = 0
+        self.descending = False
+        self._has_more = True
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        value = self.rows[index.row()][index.column()]
+        return str(value) if value is not None else ""
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self._has_more:
+            return
+
+        column = PERSON_SORT_COLUMNS[self.sort_column]
+        after = None
+        if self.rows:
+            last = self.rows[-1]
+            after = (last[self.sort_column], last[0])
+
+        page = get_persons_page(after, self.page_size, self.search, column, self.descending)
+        self._has_more = len(page) == self.page_size
+        if not page:
+            return
+
+        self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+        self.rows.extend(page)
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Сортировка на стороне базы (вызывается QTableView при щелчке по заголовку)"""
+        self.sort_column = column
+        self.descending = order == Qt.DescendingOrder
+        self.refresh()
+
+    def set_search(self, text):
+        """Фильтрует людей по подстроке имени, фамилии или группы"""
+        self.search = text.strip()
+        self.refresh()
+
+    def refresh(self):
+        """Сбрасывает загруженные строки и загружает первую страницу заново"""
+        self.beginResetModel()
+        self.rows = []
+        self._has_more = True
+        self.endResetModel()
+        self.fetchMore()
+
+    def person_id(self, row):
+        """Возвращает ID человека в строке или None"""
+        if 0 <= row < len(self.rows):
+            return self.rows[row][0]
+        return None
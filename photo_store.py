@@ -0,0 +1,82 @@
+"""
+Хранилище фотографий в файлах с адресацией по содержимому.
+
+Файл называется SHA-256 своих байтов и лежит в двухуровневом каталоге
+по первым символам хэша (ab/cd/abcd...), поэтому одинаковые фото хранятся
+один раз, а в базе остается только хэш. Чтение идет через mmap: байты
+не копируются в память процесса, пока их не декодирует OpenCV.
+"""
+import hashlib
+import mmap
+import os
+import tempfile
+
+PHOTO_STORE_DIR = "photo_store"
+
+
+class PhotoStore:
+    """Каталог фотографий, адресуемых SHA-256"""
+
+    def __init__(self, root=PHOTO_STORE_DIR):
+        self.root = root
+
+    @staticmethod
+    def hash_bytes(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def path_for(self, image_hash):
+        return os.path.join(self.root, image_hash[:2], image_hash[2:4], image_hash)
+
+    def exists(self, image_hash):
+        return os.path.exists(self.path_for(image_hash))
+
+    def put(self, data):
+        """Сохраняет байты изображения и возвращает их хэш (повторные фото не дублируются)"""
+        image_hash = self.hash_bytes(data)
+        path = self.path_for(image_hash)
+        if os.path.exists(path):
+            return image_hash
+
+        folder = os.path.dirname(path)
+        os.makedirs(folder, exist_ok=True)
+
+        # Пишем во временный файл и переименовываем, чтобы не оставить недописанное фото
+        fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return image_hash
+
+    def read(self, image_hash):
+        """
+        Возвращает содержимое фото как отображенный в память буфер (только чтение)
+        или None, если файла нет. Результат можно передавать в np.frombuffer.
+        """
+        path = self.path_for(image_hash)
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return b""
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            print(f"Ошибка: файл фото {image_hash} не найден")
+            return None
+
+    def delete(self, image_hash):
+        """Удаляет файл фото, если он есть"""
+        try:
+            os.remove(self.path_for(image_hash))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            # В Windows файл, открытый через mmap, удалить нельзя
+            print(f"Не удалось удалить файл фото {image_hash}: {e}")
+
+
+# Глобальное хранилище
+photo_store = PhotoStore()
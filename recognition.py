@@ -4,10 +4,73 @@ LBPH (Local Binary Patterns Histograms) устойчив к изменениям
 """
 import cv2
 import numpy as np
-import pickle
+import hashlib
+import mmap
 import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
-MODEL_FILE = "face_recognition_model.yml"
+from lbph import LBPHExtractor, LBPHGallery, chi_square_distances
+from model_file import read_model, write_model
+
+MODEL_FILE = "face_recognition_model.bin"
+LEGACY_MODEL_FILE = "face_recognition_model.yml"  # Прежний формат cv2.face, требует переобучения
+FACE_SIZE = (200, 200)  # Размер лица, на котором считаются признаки
+PREPROCESS_VERSION = 2  # Увеличивать при любом изменении preprocess_face
+TRAIN_WORKERS = os.cpu_count() or 1  # Процессов для подготовки признаков при обучении
+TRAIN_CHUNK = 64  # Фото в одном пакете, отправляемом в процесс
+
+# Буферы предобработки, свои у каждого потока (распознавание, обучение, GUI)
+_preprocess_local = threading.local()
+
+
+def _preprocess_buffers():
+    """Два промежуточных буфера размера FACE_SIZE для текущего потока"""
+    buffers = getattr(_preprocess_local, "buffers", None)
+    if buffers is None:
+        shape = (FACE_SIZE[1], FACE_SIZE[0])
+        buffers = _preprocess_local.buffers = (np.empty(shape, np.uint8), np.empty(shape, np.uint8))
+    return buffers
+
+
+def _batch_buffer(count):
+    """Массив (count, высота, ширина) для пачки лиц, переиспользуемый в текущем потоке"""
+    batch = getattr(_preprocess_local, "batch", None)
+    if batch is None or len(batch) < count:
+        batch = _preprocess_local.batch = np.empty((count, FACE_SIZE[1], FACE_SIZE[0]), np.uint8)
+    return batch[:count]
+
+
+def preprocess_face(face_image, out=None):
+    """
+    Предобработка лица версии PREPROCESS_VERSION, общая для обучения и распознавания
+
+    1. Приведение к FACE_SIZE (INTER_LINEAR) - фильтры дальше работают
+       на FACE_SIZE, а не на полном кропе
+    2. Выравнивание гистограммы
+    3. Гауссово размытие 3x3
+    4. Контраст: 1.2 * x + 10 с насыщением
+
+    Промежуточные результаты пишутся в буферы потока, результат - в out
+    (uint8, FACE_SIZE) или в новый массив.
+    """
+    first, second = _preprocess_buffers()
+    if face_image.ndim == 3:
+        face_image = cv2.cvtColor(face_image, cv2.COLOR_BGR2GRAY)
+
+    h, w = face_image.shape
+    if (w, h) == FACE_SIZE:
+        src = face_image
+    else:
+        src = cv2.resize(face_image, FACE_SIZE, dst=first, interpolation=cv2.INTER_LINEAR)
+
+    cv2.equalizeHist(src, dst=second)
+    cv2.GaussianBlur(second, (3, 3), 0, dst=first)
+    if out is None:
+        out = np.empty_like(first)
+    cv2.convertScaleAbs(first, dst=out, alpha=1.2, beta=10)
+    return out
 
 
 class FaceRecognizer:
@@ -15,137 +78,139 @@ class FaceRecognizer:
 
     def __init__(self):
         # ПРОСТЫЕ параметры LBPH (минимум вычислений)
-        self.recognizer = cv2.face.LBPHFaceRecognizer_create(
+        self.extractor = LBPHExtractor(
             radius=1,  # Меньше вычислений
             neighbors=8,  # Минимум соседей
             grid_x=7,  # Упрощенная сетка
-            grid_y=7,
-            threshold=100  # Стандартный порог
+            grid_y=7
         )
+        self.threshold = 100  # Стандартный порог
+        self.gallery = LBPHGallery(self.extractor.dim)
         self.labels = []
         self.label_names = {}
         self.is_trained = False
+        self.is_dirty = False  # Есть изменения, не сохраненные в файл модели
+        self._mapped_histograms = None  # Гистограммы, отображенные из файла модели
+        self._save_lock = threading.Lock()  # Модель может сохраняться из фонового потока
 
-    def prepare_training_data(self, all_photos, all_persons):
+    def iter_features(self, chunks, workers=None, total=None):
         """
-        Подготавливает данные для обучения с контролем памяти
-        """
-        faces = []
-        labels = []
-
-        self.label_names = {p[0]: f"{p[1]} {p[2]}" for p in all_persons}
-
-        total = len(all_photos)
-        print(f"Подготовка {total} фото для обучения...")
-
-        for idx, (person_id, blob) in enumerate(all_photos):
-            try:
-                # Показываем прогресс каждые 50 фото
-                if idx % 50 == 0:
-                    print(f"  Обработано {idx}/{total} фото")
-
-                # Декодируем изображение
-                img = cv2.imdecode(
-                    np.frombuffer(blob, np.uint8),
-                    cv2.IMREAD_GRAYSCALE
-                )
-
-                if img is not None:
-                    # МИНИМАЛЬНАЯ обработка
-                    img = cv2.resize(img, (200, 200))
-                    faces.append(img)
-                    labels.append(person_id)
-
-                # Очищаем память каждые 100 фото
-                if idx % 100 == 0:
-                    import gc
-                    gc.collect()
-
-            except Exception as e:
-                if idx % 20 == 0:  # Не спамить ошибками
-                    print(f"Ошибка фото {idx}: {e}")
-                continue
-
-        print(f"Подготовлено {len(faces)} лиц из {total} фото")
-        return faces, labels
-
-    def train(self, all_photos, all_persons, progress_callback=None):
-        """
-        Обучает модель на данных из базы с возможностью отслеживания прогресса
+        Считает признаки для потока пакетов фото, распределяя пакеты по процессам
 
         Args:
-            all_photos: список фотографий
-            all_persons: список людей
-            progress_callback: функция для отслеживания прогресса (опционально)
-        """
-        if not all_photos:
-            print("Нет данных для обучения")
-            return False
-
-        print(f"Начинаю обучение модели на {len(all_photos)} фото...")
+            chunks: итератор списков (ключ, blob), например пакеты строк из базы.
+                Ключ возвращается как есть: номер фото, photo_id или person_id
+            workers: число процессов (по умолчанию TRAIN_WORKERS, 1 - в текущем процессе)
+            total: общее число фото, если известно (чтобы не запускать лишние процессы)
 
-        try:
-            # Подготавливаем данные с прогрессом
-            total = len(all_photos)
-            faces = []
-            labels = []
-
-            # Создаем mapping ID -> имя для удобства
-            self.label_names = {p[0]: f"{p[1]} {p[2]}" for p in all_persons}
-
-            for i, (person_id, blob) in enumerate(all_photos):
-                try:
-                    # Обновляем прогресс каждые 10 фото
-                    if progress_callback and i % 10 == 0:
-                        progress = int((i / total) * 50)  # 50% на подготовку
-                        progress_callback(progress, f"Обработка фото {i + 1}/{total}")
-
-                    # Декодируем изображение из blob
-                    img = cv2.imdecode(
-                        np.frombuffer(blob, np.uint8),
-                        cv2.IMREAD_GRAYSCALE
-                    )
-
-                    if img is not None:
-                        # Препроцессинг
-                        img = self.preprocess_face(img)
-                        img = cv2.resize(img, (200, 200))
-                        faces.append(img)
-                        labels.append(person_id)
-
-                except Exception as e:
-                    print(f"Ошибка обработки фото {i + 1}: {e}")
-                    continue
-
-            print(f"Подготовлено {len(faces)} лиц для обучения")
-
-            if not faces:
-                print("Не удалось подготовить лица для обучения")
-                return False
+        Yields:
+            tuple: (ключи успешно декодированных фото, гистограммы (N, dim)) в порядке пакетов
+        """
+        workers = workers or TRAIN_WORKERS
+        if total is not None:
+            workers = min(workers, -(-total // TRAIN_CHUNK))
+
+        if workers <= 1:
+            for chunk in chunks:
+                keys, features = _extract_chunk(chunk, self)
+                if keys:
+                    yield keys, features
+            return
+
+        params = (self.extractor.radius, self.extractor.neighbors, self.extractor.grid_x, self.extractor.grid_y)
+        with ProcessPoolExecutor(workers, initializer=_init_feature_worker, initargs=(params,)) as pool:
+            # Держим в работе ограниченное число пакетов, чтобы не читать всю базу в память
+            pending = deque()
+            for chunk in chunks:
+                # Буферы файлового хранилища (mmap) в другой процесс передаются только копией
+                chunk = [(key, bytes(blob) if isinstance(blob, mmap.mmap) else blob) for key, blob in chunk]
+                pending.append(pool.submit(_extract_chunk, chunk))
+                if len(pending) >= 2 * workers:
+                    keys, features = pending.popleft().result()
+                    if keys:
+                        yield keys, features
+
+            while pending:
+                keys, features = pending.popleft().result()
+                if keys:
+                    yield keys, features
+
+    @property
+    def feature_version(self):
+        """Хэш параметров предобработки и LBPH: признаки с разными хэшами несовместимы"""
+        params = (
+            f"{PREPROCESS_VERSION}:{FACE_SIZE}:{self.extractor.radius}:{self.extractor.neighbors}:"
+            f"{self.extractor.grid_x}:{self.extractor.grid_y}"
+        )
+        return hashlib.sha1(params.encode()).hexdigest()[:16]
 
-            # Обучаем модель
-            if progress_callback:
-                progress_callback(75, "Обучение модели LBPH...")
+    def decode_face(self, blob):
+        """Декодирует фото из базы в изображение в оттенках серого (None при ошибке)"""
+        return cv2.imdecode(np.frombuffer(blob, np.uint8), cv2.IMREAD_GRAYSCALE)
 
-            self.recognizer.train(faces, np.array(labels))
-            self.labels = list(set(labels))
-            self.is_trained = True
+    def prepare_face(self, face_image, out=None):
+        """Препроцессинг и приведение лица к FACE_SIZE - одинаково для обучения и распознавания"""
+        return preprocess_face(face_image, out)
 
-            if progress_callback:
-                progress_callback(100, "Обучение завершено")
+    def extract_features(self, face_images):
+        """Возвращает матрицу гистограмм LBPH (N, dim) для списка лиц"""
+        batch = _batch_buffer(len(face_images))
+        for face, out in zip(face_images, batch):
+            preprocess_face(face, out)
+        return self.extractor.histograms(batch)
 
-            print(f"Модель обучена успешно! Уникальных лиц: {len(self.labels)}")
+    def fit(self, histograms, labels, all_persons):
+        """Обучает модель на готовых гистограммах"""
+        self.label_names = {p[0]: f"{p[1]} {p[2]}" for p in all_persons}
+        self.gallery.set(histograms, labels)
+        self.labels = sorted(set(int(label) for label in labels))
+        self.is_trained = True
+        self.is_dirty = True
 
-            # Сохраняем модель
-            self.save_model()
+    def add_faces(self, person_id, face_images, person_name=None):
+        """
+        Добавляет новые фото человека в модель без полного переобучения
 
-            return True
+        Args:
+            person_id: ID человека
+            face_images: изображения лиц в оттенках серого
+            person_name: имя для отображения (если известно)
 
-        except Exception as e:
-            print(f"Ошибка обучения модели: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
+        Returns:
+            np.ndarray: гистограммы добавленных лиц или None
+        """
+        faces = [face for face in face_images if face is not None and face.size > 0]
+        if not faces:
+            return None
+
+        histograms = self.extract_features(faces)
+        self.add_features(person_id, histograms, person_name)
+        return histograms
+
+    def add_features(self, person_id, histograms, person_name=None):
+        """Добавляет готовые гистограммы человека в модель"""
+        self.gallery.append(histograms, [person_id] * len(histograms))
+
+        if person_id not in self.labels:
+            self.labels.append(person_id)
+        if person_name:
+            self.label_names[person_id] = person_name
+        self.is_trained = True
+        self.is_dirty = True
+
+    def remove_person(self, person_id):
+        """Удаляет все образцы человека из модели, не затрагивая остальных"""
+        self.gallery.remove(person_id)
+
+        if person_id in self.labels:
+            self.labels.remove(person_id)
+        self.label_names.pop(person_id, None)
+        self.is_dirty = True
+
+    def set_person_name(self, person_id, person_name):
+        """Обновляет отображаемое имя человека"""
+        self.label_names[person_id] = person_name
+        self.is_dirty = True
 
     def predict(self, face_image):
         """
@@ -155,14 +220,8 @@ class FaceRecognizer:
             return None, 1000, "Модель не обучена"
 
         try:
-            # ПРЕПРОЦЕССИНГ перед распознаванием
-            face_image = self.preprocess_face(face_image)
-
-            # Нормализуем размер
-            face_resized = cv2.resize(face_image, (200, 200))
-
-            # Предсказываем
-            label, confidence = self.recognizer.predict(face_resized)
+            # Препроцессинг, гистограмма и поиск ближайшего
+            label, confidence = self._nearest(self.extract_features([face_image]))[0]
 
             # В LBPH confidence - это расстояние (чем меньше, тем лучше)
             # Преобразуем в проценты (0-100, где 100 - лучше)
@@ -177,47 +236,118 @@ class FaceRecognizer:
             print(f"Ошибка предсказания: {e}")
             return None, 0, "Ошибка распознавания"
 
-    def save_model(self, filename=MODEL_FILE):
-        """Сохраняет модель в файл"""
-        try:
-            self.recognizer.write(filename)
+    def predict_batch(self, face_images):
+        """
+        Распознает несколько лиц за один вызов
+
+        Все лица приводятся к единому размеру, переводятся в гистограммы одним
+        проходом и сравниваются со всей галереей одной матричной операцией.
 
-            # Сохраняем дополнительные данные
-            metadata = {
-                'labels': self.labels,
-                'label_names': self.label_names,
-                'is_trained': self.is_trained
-            }
+        Returns:
+            list: [(label, similarity_score, person_name)] в порядке входных лиц
+        """
+        if not face_images:
+            return []
 
-            with open(filename + '.meta', 'wb') as f:
-                pickle.dump(metadata, f)
+        if not self.is_trained:
+            return [(None, 1000, "Модель не обучена")] * len(face_images)
 
-            print(f"Модель сохранена в {filename}")
-            return True
+        try:
+            results = []
+            for label, confidence in self._nearest(self.extract_features(face_images)):
+                similarity_score = max(0, 100 - confidence)
+                person_name = self.label_names.get(label, f"ID {label}")
+                results.append((label, similarity_score, person_name))
+            return results
 
         except Exception as e:
-            print(f"Ошибка сохранения модели: {e}")
-            return False
+            print(f"Ошибка пакетного предсказания: {e}")
+            return [(None, 0, "Ошибка распознавания")] * len(face_images)
+
+    def predict_top_k(self, face_image, k=5):
+        """
+        Возвращает k наиболее похожих людей
+
+        Returns:
+            list: [(label, distance)] по возрастанию расстояния
+        """
+        if not self.is_trained:
+            return []
+
+        return self.gallery.search(self.extract_features([face_image]), k)[0]
+
+    def _nearest(self, histograms):
+        """Ближайший человек для каждой гистограммы: [(label, distance)], -1 если дальше порога"""
+        results = []
+        for matches in self.gallery.search(histograms, k=1):
+            if matches and matches[0][1] < self.threshold:
+                results.append(matches[0])
+            else:
+                # Как в cv2.face: метка -1 и бесконечное расстояние
+                results.append((-1, float("inf")))
+        return results
+
+    def save_model(self, filename=MODEL_FILE):
+        """Сохраняет модель в двоичный файл (см. model_file); можно вызывать из любого потока"""
+        with self._save_lock:
+            # Изменения, сделанные во время записи, снова отметят модель измененной
+            self.is_dirty = False
+            try:
+                self._write_model_file(filename)
+            except Exception as e:
+                self.is_dirty = True
+                print(f"Ошибка сохранения модели: {e}")
+                return False
+
+        print(f"Модель сохранена в {filename}")
+        return True
+
+    def _write_model_file(self, filename):
+        # Отображенный в память старый файл нельзя заменить (Windows) - переносим гистограммы в память
+        mapped, self._mapped_histograms = self._mapped_histograms, None
+        if mapped is not None:
+            self.gallery.detach(mapped)
+
+        histograms, labels = self.gallery.snapshot()
+        header = {
+            'feature_version': self.feature_version,
+            'radius': self.extractor.radius,
+            'neighbors': self.extractor.neighbors,
+            'grid_x': self.extractor.grid_x,
+            'grid_y': self.extractor.grid_y,
+            'threshold': self.threshold,
+            'labels': [int(label) for label in list(self.labels)],
+            'label_names': {str(label): name for label, name in dict(self.label_names).items()},
+            'is_trained': self.is_trained
+        }
+        write_model(filename, header, histograms, labels)
 
     def load_model(self, filename=MODEL_FILE):
         """Загружает модель из файла"""
         try:
             if not os.path.exists(filename):
+                if filename == MODEL_FILE and os.path.exists(LEGACY_MODEL_FILE):
+                    # Гистограммы cv2.face посчитаны прежней предобработкой
+                    print(f"Модель {LEGACY_MODEL_FILE} построена другой версией предобработки, "
+                          f"нужно переобучение")
+                    return False
                 print(f"Файл модели {filename} не найден")
                 return False
 
-            # Загружаем модель
-            self.recognizer.read(filename)
+            header, histograms, labels = read_model(filename)
+            if header.get('feature_version') != self.feature_version:
+                # Гистограммы посчитаны другой предобработкой - сравнивать с ними нельзя
+                print(f"Модель {filename} построена другой версией предобработки, нужно переобучение")
+                return False
 
-            # Загружаем метаданные
-            meta_file = filename + '.meta'
-            if os.path.exists(meta_file):
-                with open(meta_file, 'rb') as f:
-                    metadata = pickle.load(f)
-                    self.labels = metadata.get('labels', [])
-                    self.label_names = metadata.get('label_names', {})
-                    self.is_trained = metadata.get('is_trained', False)
+            self.threshold = header['threshold']
+            self.gallery.set(histograms, labels)
+            self._mapped_histograms = histograms
+            self.labels = header['labels']
+            self.label_names = {int(label): name for label, name in header['label_names'].items()}
+            self.is_trained = header['is_trained']
 
+            self.is_dirty = False
             print(f"Модель загружена из {filename}. Лиц в базе: {len(self.labels)}")
             return True
 
@@ -239,22 +369,12 @@ class FaceRecognizer:
             return 0
 
         try:
-            # Создаем временную модель для сравнения двух лиц
-            temp_recognizer = cv2.face.LBPHFaceRecognizer_create()
-
-            # Подготавливаем данные
-            faces = [
+            # Расстояние хи-квадрат между гистограммами двух лиц
+            histograms = self.extractor.histograms(np.stack([
                 cv2.resize(face1, (200, 200)),
                 cv2.resize(face2, (200, 200))
-            ]
-            labels = [1, 2]  # Разные метки
-
-            # Обучаем на двух лицах
-            temp_recognizer.train(faces, np.array(labels))
-
-            # Пытаемся распознать первое лицо как второе
-            test_face = cv2.resize(face1, (200, 200))
-            label, confidence = temp_recognizer.predict(test_face)
+            ]))
+            confidence = float(chi_square_distances(histograms[:1], histograms[1:])[0, 0])
 
             # Преобразуем confidence в проценты
             similarity = max(0, 100 - confidence)
@@ -265,30 +385,40 @@ class FaceRecognizer:
             print(f"Ошибка сравнения лиц: {e}")
             return 0
 
-    def preprocess_face(self, face_image):
-        """
-        Подготавливает лицо для лучшего распознавания
-        """
-        if face_image is None or face_image.size == 0:
-            return face_image
 
-        try:
-            # 1. Нормализация гистограммы (выравнивание освещения)
-            face_image = cv2.equalizeHist(face_image)
+# Создаем глобальный экземпляр для использования в других модулях
+face_recognizer = FaceRecognizer()
 
-            # 2. Гауссово размытие для уменьшения шума
-            face_image = cv2.GaussianBlur(face_image, (3, 3), 0)
+# Распознаватель процесса подготовки признаков, создается в _init_feature_worker
+_worker_recognizer = None
 
-            # 3. Увеличение контраста
-            face_image = cv2.convertScaleAbs(face_image, alpha=1.2, beta=10)
 
-            return face_image
-        except Exception as e:
-            print(f"Ошибка препроцессинга: {e}")
-            return face_image
+def _init_feature_worker(params):
+    """Инициализирует процесс подготовки признаков"""
+    global _worker_recognizer
+    # Параллельность уже обеспечена процессами, внутренние потоки OpenCV только мешают
+    cv2.setNumThreads(1)
+    _worker_recognizer = FaceRecognizer()
+    _worker_recognizer.extractor = LBPHExtractor(*params)
 
-# Создаем глобальный экземпляр для использования в других модулях
-face_recognizer = FaceRecognizer()
+
+def _extract_chunk(chunk, recognizer=None):
+    """Декодирует пакет (ключ, blob) и считает гистограммы, возвращает (ключи, гистограммы)"""
+    recognizer = recognizer or _worker_recognizer
+    keys, faces = [], []
+    for key, blob in chunk:
+        try:
+            face = recognizer.decode_face(blob)
+        except Exception as e:
+            print(f"Ошибка обработки фото {key}: {e}")
+            continue
+        if face is not None:
+            keys.append(key)
+            faces.append(face)
+
+    if not faces:
+        return [], None
+    return keys, recognizer.extract_features(faces)
 
 def compare_faces(face1, face2):
     """
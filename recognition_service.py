@@ -1,14 +1,30 @@
 """
 Сервис для распознавания лиц с использованием обученной модели
 """
+import time
+
 import cv2
 import numpy as np
 from image_utils import extract_face
-from recognition import face_recognizer
-from database import get_all_photos, get_person_by_id, add_recognition_log, get_all_persons
+from recognition import face_recognizer, TRAIN_CHUNK
+from feature_cache import FeatureCache
+from log_writer import recognition_log_writer
+from track_aggregation import TrackAggregator
+from track_cache import TrackResultCache, crop_fingerprint
+from database import get_photo_index, get_photos_by_ids, get_person_by_id, get_all_persons, add_listener
 
 THRESHOLD = 70.0  # Повышенный порог уверенности (в процентах)
 
+_feature_cache = None
+
+
+def get_feature_cache():
+    """Возвращает кэш признаков для текущей версии предобработки"""
+    global _feature_cache
+    if _feature_cache is None or _feature_cache.version != face_recognizer.feature_version:
+        _feature_cache = FeatureCache(face_recognizer.feature_version)
+    return _feature_cache
+
 
 def initialize_recognition():
     """
@@ -24,14 +40,7 @@ def initialize_recognition():
 
     # Если нет сохраненной модели, обучаем новую
     print("Сохраненной модели нет. Обучаю новую...")
-    all_photos = get_all_photos()
-    all_persons = get_all_persons()
-
-    if not all_photos:
-        print("✗ В базе нет фотографий для обучения")
-        return False
-
-    success = face_recognizer.train(all_photos, all_persons)
+    success = retrain_model()
 
     if success:
         print("✓ Модель успешно обучена")
@@ -41,20 +50,115 @@ def initialize_recognition():
         return False
 
 
-def retrain_model():
+def retrain_model(progress_callback=None, workers=None):
     """
     Переобучает модель на текущих данных из базы
     Используется при добавлении/удалении людей
+
+    Гистограммы берутся из кэша признаков, декодируются и обрабатываются
+    только новые фото или все фото после смены предобработки.
+
+    Args:
+        progress_callback: функция (процент, сообщение) для отслеживания прогресса
+        workers: число процессов для обработки фото (по умолчанию TRAIN_WORKERS)
     """
     print("Переобучение модели...")
-    all_photos = get_all_photos()
+    photo_index = get_photo_index()
     all_persons = get_all_persons()
 
-    if not all_photos:
+    if not photo_index:
         print("Нет данных для обучения")
         return False
 
-    return face_recognizer.train(all_photos, all_persons)
+    try:
+        cache = get_feature_cache()
+        total = len(photo_index)
+        positions = {photo_id: row for row, (photo_id, _) in enumerate(photo_index)}
+        labels = np.fromiter((person_id for _, person_id in photo_index), dtype=np.int32, count=total)
+        histograms = np.empty((total, face_recognizer.extractor.dim), dtype=np.float32)
+        valid = np.zeros(total, dtype=bool)
+
+        cached = cache.load_into(positions, histograms)
+        valid[[positions[photo_id] for photo_id in cached]] = True
+        missing = [photo_id for photo_id, _ in photo_index if photo_id not in cached]
+        print(f"Из кэша признаков: {len(cached)}, к обработке: {len(missing)}")
+
+        # Фото без кэша читаются из базы пакетами и обрабатываются в нескольких процессах
+        chunks = (
+            [(photo_id, blob) for photo_id, _, blob in get_photos_by_ids(missing[start:start + TRAIN_CHUNK])]
+            for start in range(0, len(missing), TRAIN_CHUNK)
+        )
+
+        done = 0
+        for ids, features in face_recognizer.iter_features(chunks, workers, len(missing)):
+            rows = [positions[photo_id] for photo_id in ids]
+            histograms[rows] = features
+            valid[rows] = True
+            cache.put_many(zip(ids, features))
+
+            done += len(ids)
+            if progress_callback:
+                progress = int((len(cached) + done) / total * 90)
+                progress_callback(progress, f"Обработано фото {done}/{len(missing)}")
+
+        if not valid.any():
+            print("Нет данных для обучения")
+            return False
+
+        if progress_callback:
+            progress_callback(95, "Сохранение модели...")
+
+        face_recognizer.fit(histograms[valid], labels[valid], all_persons)
+        cache.prune(positions)
+        success = face_recognizer.save_model()
+
+        if progress_callback:
+            progress_callback(100, "Обучение завершено!")
+
+        print(f"Модель обучена на {int(valid.sum())} фото")
+        return success
+
+    except Exception as e:
+        print(f"Ошибка при обучении модели: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def save_model_if_changed():
+    """
+    Сохраняет модель, если после последнего сохранения она менялась инкрементально
+    Вызывается по окончании добавления фото, после удаления и при выходе
+    """
+    if face_recognizer.is_dirty:
+        return face_recognizer.save_model()
+    return True
+
+
+def _on_database_change(event, **data):
+    """Инкрементально обновляет модель при изменениях в базе"""
+    if event == "photo_added":
+        face = cv2.imdecode(np.frombuffer(data['image_bytes'], np.uint8), cv2.IMREAD_GRAYSCALE)
+        if face is not None:
+            features = face_recognizer.add_faces(data['person_id'], [face])
+            if features is not None:
+                get_feature_cache().put_many([(data['photo_id'], features[0])])
+    elif event == "photos_added":
+        # Пакет фото обрабатывается одним вызовом extract_features
+        decoded = [(photo_id, face_recognizer.decode_face(image))
+                   for photo_id, image in zip(data['photo_ids'], data['images'])]
+        decoded = [(photo_id, face) for photo_id, face in decoded if face is not None and face.size > 0]
+        if decoded:
+            features = face_recognizer.add_faces(data['person_id'], [face for _, face in decoded])
+            if features is not None:
+                get_feature_cache().put_many(zip([photo_id for photo_id, _ in decoded], features))
+    elif event == "person_deleted":
+        face_recognizer.remove_person(data['person_id'])
+    elif event in ("person_added", "person_updated"):
+        face_recognizer.set_person_name(data['person_id'], f"{data['first_name']} {data['last_name']}")
+
+
+add_listener(_on_database_change)
 
 
 def recognize_face(face_image):
@@ -86,12 +190,9 @@ def recognize_face(face_image):
     # Проверяем порог
     recognized = similarity >= THRESHOLD and person_id is not None
 
-    # Логируем результат
-    try:
-        result = "SUCCESS" if recognized else "FAILED"
-        add_recognition_log(person_id if recognized else None, similarity, result)
-    except:
-        pass  # Не прерываем работу если логирование не удалось
+    # Логируем результат (запись в базу идет пакетами в фоновом потоке)
+    result = "SUCCESS" if recognized else "FAILED"
+    recognition_log_writer.log(person_id if recognized else None, similarity, result)
 
     return {
         'person_id': person_id,
@@ -101,6 +202,122 @@ def recognize_face(face_image):
     }
 
 
+def _predict_faces(face_images):
+    """Пакетное распознавание без записи в журнал, результаты в формате recognize_face"""
+    results = []
+    for person_id, similarity, person_name in face_recognizer.predict_batch(face_images):
+        results.append({
+            'person_id': person_id,
+            'similarity': similarity,
+            'person_name': person_name,
+            'recognized': similarity >= THRESHOLD and person_id is not None
+        })
+    return results
+
+
+def recognize_faces(face_images):
+    """
+    Распознает все лица кадра одним пакетом
+
+    Args:
+        face_images: список изображений лиц в оттенках серого
+
+    Returns:
+        list: результаты в формате recognize_face, в порядке входных лиц
+    """
+    if not face_images:
+        return []
+
+    if not face_recognizer.is_trained:
+        return [recognize_face(face) for face in face_images]
+
+    results = _predict_faces(face_images)
+    for result in results:
+        # Логируем результат (запись в базу идет пакетами в фоновом потоке)
+        recognized = result['recognized']
+        recognition_log_writer.log(
+            result['person_id'] if recognized else None,
+            result['similarity'],
+            "SUCCESS" if recognized else "FAILED"
+        )
+
+    return results
+
+
+def create_track_aggregator():
+    """Создает накопитель результатов по трекам, который пишет в журнал одно событие на трек"""
+    return TrackAggregator(THRESHOLD, on_event=recognition_log_writer.log)
+
+
+def create_track_result_cache():
+    """Создает кэш результатов по трекам для recognize_tracked_faces"""
+    return TrackResultCache()
+
+
+def _predict_tracked_faces(tracked_faces, result_cache):
+    """Распознает только те треки, кроп которых заметно изменился с прошлого распознавания"""
+    now = time.monotonic()
+    # Результаты, полученные до изменения галереи, могут указывать на удаленных людей
+    result_cache.sync(face_recognizer.gallery.version)
+    results = [None] * len(tracked_faces)
+    pending = []
+    for i, (track_id, face) in enumerate(tracked_faces):
+        fingerprint = crop_fingerprint(face)
+        results[i] = result_cache.lookup(track_id, fingerprint, now)
+        if results[i] is None:
+            pending.append((i, fingerprint))
+
+    if pending:
+        predicted = _predict_faces([tracked_faces[i][1] for i, _ in pending])
+        for (i, fingerprint), result in zip(pending, predicted):
+            result_cache.store(tracked_faces[i][0], fingerprint, result, now)
+            results[i] = result
+
+    result_cache.prune(now)
+    return results
+
+
+def recognize_tracked_faces(tracked_faces, aggregator, result_cache=None):
+    """
+    Распознает лица видеопотока с накоплением результатов по трекам
+
+    В отличие от recognize_faces решение принимается голосованием по последним
+    кадрам трека, а в журнал попадает одно событие на трек (см. TrackAggregator).
+    С кэшем результатов неподвижные лица не распознаются заново каждый кадр.
+
+    Args:
+        tracked_faces: список (track_id, изображение лица)
+        aggregator: накопитель из create_track_aggregator()
+        result_cache: кэш из create_track_result_cache() или None
+
+    Returns:
+        list: результаты в формате recognize_face, в порядке входных лиц
+    """
+    if not face_recognizer.is_trained:
+        return [{
+            'person_id': None,
+            'similarity': 0,
+            'person_name': 'Модель не обучена',
+            'recognized': False
+        } for _ in tracked_faces]
+
+    if not tracked_faces:
+        results = []
+    elif result_cache is not None:
+        results = _predict_tracked_faces(tracked_faces, result_cache)
+    else:
+        results = _predict_faces([face for _, face in tracked_faces])
+    decisions = aggregator.update([
+        (track_id, result['person_id'], result['similarity'])
+        for (track_id, _), result in zip(tracked_faces, results)
+    ])
+
+    for result, decision in zip(results, decisions):
+        result.update(decision)
+        result['person_name'] = face_recognizer.label_names.get(decision['person_id'], 'Неизвестный')
+    return results
+
+
 def recognize_from_camera():
     """
     Функция для распознавания с камеры (консольный режим)
@@ -149,6 +366,7 @@ def recognize_from_camera():
 
     cap.release()
     cv2.destroyAllWindows()
+    recognition_log_writer.stop()
 
 # Автоматически инициализируем при импорте (можно отключить)
 # initialize_recognition()
\ No newline at end of file
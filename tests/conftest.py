@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# Модули проекта лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Пустая база в отдельном каталоге (faces.db и photo_store создаются в нем)"""
+    import database
+
+    monkeypatch.chdir(tmp_path)
+    database.close_connections()
+    database.init_db()
+    yield database
+    database.close_connections()
@@ -0,0 +1,38 @@
+def _names(rows):
+    return sorted(row[1] for row in rows)
+
+
+def test_persons_search_matches_wildcards_literally(db):
+    db.add_person("Ann_a", "One", "G1")
+    db.add_person("Anna", "Two", "G1")
+    db.add_person("Bob", "100%", "G2")
+    db.add_person("Bill", "1000", "G2")
+    db.add_person("C\\D", "Three", "G3")
+    db.add_person("CxD", "Four", "G3")
+
+    assert _names(db.get_persons_page(search="n_a")) == ["Ann_a"]
+    assert _names(db.get_persons_page(search="0%")) == ["Bob"]
+    assert _names(db.get_persons_page(search="\\")) == ["C\\D"]
+    assert _names(db.get_persons_page(search="ann")) == ["Ann_a", "Anna"]
+
+
+def test_persons_search_ignores_case_for_cyrillic(db):
+    db.add_person("Иван", "Петров", "ИВТ-1")
+    db.add_person("Анна", "Иванова", "ПИ-2")
+    db.add_person("Олег", "Сидоров", "ивт-3")
+
+    assert _names(db.get_persons_page(search="иван")) == ["Анна", "Иван"]
+    assert _names(db.get_persons_page(search="ИВАН")) == ["Анна", "Иван"]
+    assert _names(db.get_persons_page(search="Ивт")) == ["Иван", "Олег"]
+
+
+def test_update_of_deleted_person_does_not_cache_it(db):
+    person_id = db.add_person("Иван", "Петров", "ИВТ-1")
+    db.delete_person(person_id)
+
+    assert db.update_person(person_id, "Иван", "Сидоров", "ИВТ-1", None) is False
+    assert db.get_person_by_id(person_id) is None
+
+    other = db.add_person("Анна", "Иванова", "ПИ-2")
+    assert db.update_person(other, "Анна", "Смирнова", "ПИ-2", None) is True
+    assert db.get_person_by_id(other)[2] == "Смирнова"
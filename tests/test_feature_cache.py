@@ -0,0 +1,44 @@
+import sqlite3
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+
+def _stored_photo_ids(path):
+    conn = sqlite3.connect(path)
+    try:
+        return sorted(row[0] for row in conn.execute("SELECT photo_id FROM features"))
+    finally:
+        conn.close()
+
+
+def test_new_feature_version_invalidates_cached_rows(tmp_path):
+    from feature_cache import FeatureCache
+
+    path = str(tmp_path / "features.db")
+    histograms = np.arange(12, dtype=np.float32).reshape(3, 4)
+    positions = {10: 0, 11: 1, 12: 2}
+
+    old = FeatureCache("v1", path)
+    old.put_many(zip([10, 11, 12], histograms))
+    matrix = np.zeros_like(histograms)
+    assert old.load_into(positions, matrix) == {10, 11, 12}
+    assert np.array_equal(matrix, histograms)
+
+    # Признаки другой версии предобработки не выдаются, даже если photo_id совпадает
+    new = FeatureCache("v2", path)
+    matrix = np.zeros_like(histograms)
+    assert new.load_into(positions, matrix) == set()
+    assert not matrix.any()
+
+    new.put_many([(11, histograms[1] + 1)])
+    assert new.load_into(positions, matrix) == {11}
+    assert np.array_equal(matrix[1], histograms[1] + 1)
+
+    # prune удаляет записи старой версии и фото, которых больше нет
+    new.prune([10, 12])
+    assert _stored_photo_ids(path) == []
+    new.put_many([(12, histograms[2])])
+    new.prune([12])
+    assert _stored_photo_ids(path) == [12]
@@ -0,0 +1,32 @@
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+import numpy as np  # noqa: E402
+
+
+def _frame(seed):
+    noise = np.random.default_rng(seed).integers(0, 256, (240, 320), dtype=np.uint8)
+    return cv2.cvtColor(cv2.GaussianBlur(noise, (5, 5), 0), cv2.COLOR_GRAY2BGR)
+
+
+@pytest.fixture
+def tracker(monkeypatch):
+    import image_utils
+
+    # Каскад всегда находит лицо на одном и том же месте
+    monkeypatch.setattr(image_utils, "_detect_scaled", lambda small, scale, config: [(100, 80, 60, 60)])
+    return image_utils.FaceTracker(detect_every=5)
+
+
+def test_track_keeps_id_while_template_matches(tracker):
+    frame = _frame(0)
+    first = tracker.update(frame)
+    assert [track_id for track_id, _ in tracker.update(frame)] == [first[0][0]]
+
+
+def test_new_face_on_the_same_spot_gets_new_id(tracker):
+    first = tracker.update(_frame(0))
+    # Шаблон на другом кадре не совпадает: это уже другой человек, хотя бокс тот же
+    second = tracker.update(_frame(1))
+    assert second[0][1] == first[0][1]
+    assert second[0][0] != first[0][0]
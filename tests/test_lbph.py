@@ -0,0 +1,113 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import lbph  # noqa: E402
+from lbph import LBPHExtractor, LBPHGallery, chi_square_distances  # noqa: E402
+
+
+def _histograms(count, dim=64, seed=0):
+    """Нормированные гистограммы с пустыми корзинами, как у настоящих LBP"""
+    rng = np.random.default_rng(seed)
+    histograms = rng.random((count, dim), dtype=np.float32)
+    histograms[histograms < 0.3] = 0
+    return histograms / histograms.sum(axis=1, keepdims=True)
+
+
+def _naive_chi_square(probe, sample):
+    """HISTCMP_CHISQR_ALT как в OpenCV: 2 * sum((p - g)^2 / (p + g)) по непустым корзинам"""
+    total = 0.0
+    for p, g in zip(probe.astype(np.float64), sample.astype(np.float64)):
+        if p + g > np.finfo(np.float64).eps:
+            total += (p - g) ** 2 / (p + g)
+    return 2 * total
+
+
+@pytest.mark.parametrize("workers", [1, None])
+def test_chi_square_matches_naive_loop(workers):
+    probes = _histograms(3, seed=1)
+    # Галерея больше GALLERY_CHUNK_ROWS: проверяются и границы задач пула
+    gallery = _histograms(lbph.GALLERY_CHUNK_ROWS + 37, seed=2)
+    gallery[5] = probes[0]
+
+    distances = chi_square_distances(probes, gallery, workers=workers)
+
+    assert distances.shape == (3, len(gallery))
+    assert distances[0, 5] == pytest.approx(0, abs=1e-5)
+    for p in range(len(probes)):
+        for g in (0, 5, lbph.GALLERY_CHUNK_ROWS - 1, lbph.GALLERY_CHUNK_ROWS, len(gallery) - 1):
+            assert distances[p, g] == pytest.approx(_naive_chi_square(probes[p], gallery[g]), rel=1e-4, abs=1e-5)
+
+
+def test_chi_square_empty_inputs():
+    assert chi_square_distances(_histograms(2), np.empty((0, 64), np.float32)).shape == (2, 0)
+    assert chi_square_distances(np.empty((0, 64), np.float32), _histograms(4)).shape == (0, 4)
+
+
+@pytest.mark.parametrize("index_mode", ["flat", "prototype"])
+def test_gallery_set_append_remove_search(index_mode):
+    people = _histograms(4, seed=3)
+    noise = np.random.default_rng(4)
+
+    def samples(person, count):
+        return np.abs(people[person] + noise.normal(0, 0.002, (count, people.shape[1]))).astype(np.float32)
+
+    gallery = LBPHGallery(people.shape[1], index_mode=index_mode)
+    gallery.set(np.vstack([samples(2, 3), samples(0, 3)]), [12, 12, 12, 10, 10, 10])
+    version = gallery.version
+    assert len(gallery) == 6
+    assert gallery.labels.tolist() == [10, 10, 10, 12, 12, 12]  # Образцы человека хранятся подряд
+
+    matches = gallery.search(people[[0, 2]], k=2)
+    assert [m[0][0] for m in matches] == [10, 12]
+    assert [label for label, _ in matches[0]] == [10, 12]  # По одному лучшему образцу на человека
+
+    gallery.append(samples(1, 2), [11, 11])
+    assert gallery.version > version
+    assert gallery.search(people[[1]])[0][0][0] == 11
+
+    version = gallery.version
+    gallery.remove(10)
+    assert gallery.version > version
+    assert sorted(set(gallery.labels.tolist())) == [11, 12]
+    assert gallery.search(people[[0]], k=5)[0][0][0] != 10
+
+    version = gallery.version
+    gallery.remove(99)  # Несуществующий человек - галерея не меняется
+    assert gallery.version == version
+
+
+def test_gallery_index_mode_follows_module_setting(monkeypatch):
+    gallery = LBPHGallery(64)
+    fixed = LBPHGallery(64, index_mode="flat")
+    for g in (gallery, fixed):
+        g.set(_histograms(6, seed=6), [1, 1, 2, 2, 3, 3])
+
+    # Смена настройки после создания галереи действует на следующий поиск
+    monkeypatch.setattr(lbph, "INDEX_MODE", "prototype")
+    gallery.search(_histograms(1, seed=7))
+    fixed.search(_histograms(1, seed=7))
+    assert gallery._index is not None
+    assert fixed._index is None
+
+
+def test_histograms_match_cv2_face():
+    cv2 = pytest.importorskip("cv2")
+    if not hasattr(cv2, "face"):
+        pytest.skip("нужен opencv-contrib-python (cv2.face)")
+
+    rng = np.random.default_rng(5)
+    faces = [cv2.GaussianBlur(rng.integers(0, 256, (100, 90), dtype=np.uint8), (5, 5), 0) for _ in range(4)]
+    probe, faces = faces[0], faces[1:]
+    recognizer = cv2.face.LBPHFaceRecognizer_create(1, 8, 7, 7)
+    recognizer.train(faces, np.arange(len(faces), dtype=np.int32))
+    expected = np.vstack([h.reshape(1, -1) for h in recognizer.getHistograms()])
+
+    extractor = LBPHExtractor(radius=1, neighbors=8, grid_x=7, grid_y=7)
+    actual = extractor.histograms(np.stack(faces))
+    np.testing.assert_allclose(actual, expected, rtol=1e-4, atol=1e-6)
+
+    label, distance = recognizer.predict(probe)
+    distances = chi_square_distances(extractor.histograms(probe), actual)[0]
+    assert int(np.argmin(distances)) == label
+    assert distances[label] == pytest.approx(distance, rel=1e-4)
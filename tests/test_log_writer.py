@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    """Пакеты, которые писатель журнала передал бы в базу"""
+    import log_writer
+
+    written = []
+    monkeypatch.setattr(log_writer, "add_recognition_logs", lambda rows: written.append(list(rows)))
+    return written
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_stop_writes_pending_rows_to_database(db):
+    from log_writer import RecognitionLogWriter
+
+    person_id = db.add_person("Иван", "Петров", "ИВТ-1")
+    writer = RecognitionLogWriter(batch_size=100, flush_interval=60)
+    for i in range(5):
+        writer.log(person_id if i % 2 else None, 50.0 + i, "ok" if i % 2 else "unknown")
+    writer.stop()
+
+    with db.connect() as conn:
+        rows = conn.execute("SELECT recognized_person_id, result FROM recognition_logs ORDER BY log_id").fetchall()
+    assert rows == [(None, "unknown"), (person_id, "ok"), (None, "unknown"), (person_id, "ok"), (None, "unknown")]
+
+
+def test_full_batches_are_written_without_waiting(batches):
+    from log_writer import RecognitionLogWriter
+
+    writer = RecognitionLogWriter(batch_size=3, flush_interval=60)
+    for i in range(7):
+        writer.log(i, 0.0, "ok")
+    assert _wait_for(lambda: len(batches) == 2)
+    writer.stop()
+
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert [row[1] for batch in batches for row in batch] == list(range(7))
+
+
+def test_partial_batch_is_written_after_flush_interval(batches):
+    from log_writer import RecognitionLogWriter
+
+    writer = RecognitionLogWriter(batch_size=100, flush_interval=0.05)
+    writer.log(1, 0.0, "ok")
+    assert _wait_for(lambda: len(batches) == 1)
+    writer.stop()
+    assert len(batches) == 1
+
+
+def test_overflowing_queue_drops_rows(batches, monkeypatch):
+    from log_writer import RecognitionLogWriter
+
+    writer = RecognitionLogWriter(batch_size=100, flush_interval=60, max_queue=2)
+    monkeypatch.setattr(writer, "_ensure_started", lambda: None)  # Поток не запущен, очередь не разбирается
+    for i in range(5):
+        writer.log(i, 0.0, "ok")
+    assert writer.dropped == 3
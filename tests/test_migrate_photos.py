@@ -0,0 +1,21 @@
+import os
+
+
+def test_missing_files_are_not_counted_as_moved(db):
+    import migrate_photos
+    from photo_store import photo_store
+
+    person_id = db.add_person("Иван", "Петров", "ИВТ-1")
+    for data in (b"photo-1", b"photo-2", b"photo-3"):
+        db.add_photo(person_id, "photo.jpg", "jpg", len(data), data)
+
+    assert migrate_photos.migrate_to_files() == 3
+
+    with db.connect() as conn:
+        lost_hash = conn.execute("SELECT image_hash FROM photos ORDER BY photo_id LIMIT 1").fetchone()[0]
+    os.remove(photo_store.path_for(lost_hash))
+
+    assert migrate_photos.migrate_to_database() == 2
+    with db.connect() as conn:
+        remaining = conn.execute("SELECT COUNT(*) FROM photos WHERE image_hash IS NOT NULL").fetchone()[0]
+    assert remaining == 1
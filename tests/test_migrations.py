@@ -0,0 +1,111 @@
+import sqlite3
+
+import pytest
+
+# Схема базы исходной версии приложения (до schema_version)
+BASELINE_SCHEMA = """
+CREATE TABLE persons (
+    person_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    academic_group TEXT NOT NULL,
+    description TEXT
+);
+CREATE TABLE photos (
+    photo_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    person_id INTEGER NOT NULL,
+    file_name TEXT NOT NULL,
+    file_format TEXT NOT NULL,
+    file_size INTEGER NOT NULL,
+    image_data BLOB NOT NULL,
+    FOREIGN KEY (person_id) REFERENCES persons(person_id)
+);
+CREATE TABLE recognition_logs (
+    log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recognition_time TEXT NOT NULL,
+    recognized_person_id INTEGER,
+    similarity_score REAL,
+    result TEXT NOT NULL,
+    FOREIGN KEY (recognized_person_id) REFERENCES persons(person_id)
+);
+"""
+
+
+@pytest.fixture
+def baseline_db(tmp_path, monkeypatch):
+    """База исходной версии с данными, включая записи удаленного без каскада человека"""
+    import database
+
+    monkeypatch.chdir(tmp_path)
+    conn = sqlite3.connect(database.DB_NAME)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.executemany("INSERT INTO persons VALUES (?, ?, ?, ?, ?)", [
+        (1, "Иван", "Петров", "ИВТ-1", None),
+        (2, "Анна", "Иванова", "ПИ-2", "староста"),
+    ])
+    conn.executemany("INSERT INTO photos VALUES (NULL, ?, ?, ?, ?, ?)", [
+        (1, "a.jpg", "jpg", 3, b"aaa"),
+        (2, "b.jpg", "jpg", 3, b"bbb"),
+        (3, "lost.jpg", "jpg", 3, b"ccc"),  # Человек 3 удален старой версией, фото осталось
+    ])
+    conn.executemany("INSERT INTO recognition_logs VALUES (NULL, ?, ?, ?, ?)", [
+        ("2024-01-01T10:00:00", 1, 80.0, "ok"),
+        ("2024-01-01T10:00:01", None, 20.0, "unknown"),
+        ("2024-01-01T10:00:02", 3, 75.0, "ok"),
+    ])
+    conn.commit()
+    conn.close()
+
+    database.close_connections()
+    database.init_db()
+    yield database
+    database.close_connections()
+
+
+def _tables_and_indexes(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'index')")}
+
+
+def test_baseline_database_is_migrated_to_latest_schema(baseline_db):
+    db = baseline_db
+    latest = db.MIGRATIONS[-1][0]
+    assert db.get_schema_version() == latest
+
+    with db.connect() as conn:
+        names = _tables_and_indexes(conn)
+        photo_columns = [row[1] for row in conn.execute("PRAGMA table_info(photos)")]
+        photos = conn.execute(
+            "SELECT person_id, file_name, image_data, image_hash FROM photos ORDER BY photo_id"
+        ).fetchall()
+        logs = conn.execute("SELECT recognized_person_id, result FROM recognition_logs ORDER BY log_id").fetchall()
+        assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+
+    assert {"thumbnails", "idx_photos_person_id", "idx_photos_image_hash", "idx_logs_person_id",
+            "idx_logs_time", "idx_persons_last_name"} <= names
+    assert "image_hash" in photo_columns
+
+    # Данные сохранены, записи несуществующего человека удалены
+    assert photos == [(1, "a.jpg", b"aaa", None), (2, "b.jpg", b"bbb", None)]
+    assert logs == [(1, "ok"), (None, "unknown")]
+    assert db.get_person_by_id(2)[1:] == ("Анна", "Иванова", "ПИ-2", "староста")
+
+
+def test_migrated_database_deletes_person_data_in_cascade(baseline_db):
+    db = baseline_db
+    db.delete_person(1)
+
+    with db.connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM photos WHERE person_id=1").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM recognition_logs WHERE recognized_person_id=1").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM photos").fetchone()[0] == 1
+
+
+def test_repeated_init_does_not_rerun_migrations(baseline_db, capsys):
+    db = baseline_db
+    capsys.readouterr()
+    db.init_db()
+
+    assert "миграция" not in capsys.readouterr().out
+    with db.connect() as conn:
+        versions = [row[0] for row in conn.execute("SELECT version FROM schema_version ORDER BY version")]
+    assert versions == [version for version, _ in db.MIGRATIONS]
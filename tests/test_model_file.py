@@ -0,0 +1,49 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+
+def test_histogram_damage_is_found_only_by_full_check(tmp_path):
+    from model_file import read_model, verify_model, write_model
+
+    filename = str(tmp_path / "model.bin")
+    histograms = np.random.default_rng(0).random((10, 32), dtype=np.float32)
+    labels = np.array([3, 1, 2, 1, 3, 2, 1, 2, 3, 1], dtype=np.int32)
+    write_model(filename, {"threshold": 80.0}, histograms, labels)
+
+    header, loaded, loaded_labels = read_model(filename, verify_histograms=True)
+    order = np.argsort(labels, kind="stable")
+    assert header["threshold"] == 80.0
+    assert np.array_equal(loaded, histograms[order])
+    assert np.array_equal(loaded_labels, labels[order])
+    del loaded
+    assert verify_model(filename) == (True, "")
+
+    # Портим байт в середине гистограмм: быстрая загрузка его не видит, полная проверка - видит
+    data = bytearray(open(filename, "rb").read())
+    data[len(data) // 2] ^= 0xFF
+    open(filename, "wb").write(data)
+    read_model(filename)
+    assert verify_model(filename)[0] is False
+
+    # Поврежденные метки обнаруживаются при каждой загрузке
+    data[-1] ^= 0xFF
+    open(filename, "wb").write(data)
+    with pytest.raises(ValueError):
+        read_model(filename)
+
+
+@pytest.mark.parametrize("header", [
+    b"[]", b'{"dim": 32}', b'{"count": "10", "dim": 32}', b'{"count": 1, "dim": null}'
+])
+def test_malformed_header_is_reported_as_damage(tmp_path, header):
+    from model_file import MODEL_FORMAT_VERSION, MODEL_MAGIC, _PREFIX, read_model, verify_model
+
+    filename = str(tmp_path / "model.bin")
+    with open(filename, "wb") as f:
+        f.write(_PREFIX.pack(MODEL_MAGIC, MODEL_FORMAT_VERSION, len(header), 0, 0))
+        f.write(header)
+
+    with pytest.raises(ValueError):
+        read_model(filename)
+    assert verify_model(filename)[0] is False
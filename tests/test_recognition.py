@@ -0,0 +1,29 @@
+import os
+import pickle
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+import numpy as np  # noqa: E402
+
+
+@pytest.mark.skipif(not hasattr(cv2, "face"), reason="нужен opencv-contrib-python (cv2.face)")
+def test_baseline_cv2_model_requires_retraining(tmp_path, monkeypatch):
+    from recognition import FaceRecognizer, LEGACY_MODEL_FILE, MODEL_FILE
+
+    monkeypatch.chdir(tmp_path)
+
+    # Модель в формате прежних версий: cv2.face.LBPHFaceRecognizer + pickle с метаданными
+    rng = np.random.default_rng(0)
+    faces = [rng.integers(0, 256, (200, 200), dtype=np.uint8) for _ in range(2)]
+    legacy = cv2.face.LBPHFaceRecognizer_create()
+    legacy.train(faces, np.array([1, 2], dtype=np.int32))
+    legacy.write(LEGACY_MODEL_FILE)
+    with open(LEGACY_MODEL_FILE + ".meta", "wb") as f:
+        pickle.dump({"labels": [1, 2], "label_names": {1: "A", 2: "B"}, "is_trained": True}, f)
+
+    recognizer = FaceRecognizer()
+    assert recognizer.load_model() is False
+    assert not recognizer.is_trained
+    assert len(recognizer.gallery.histograms) == 0
+    assert not os.path.exists(MODEL_FILE)
@@ -0,0 +1,84 @@
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+import numpy as np  # noqa: E402
+
+from track_cache import TrackResultCache, crop_fingerprint  # noqa: E402
+
+
+def _face(seed, size=(120, 100)):
+    noise = np.random.default_rng(seed).integers(0, 256, size, dtype=np.uint8)
+    return cv2.GaussianBlur(noise, (7, 7), 0)
+
+
+def test_fingerprint_ignores_brightness_and_crop_size():
+    face = _face(0)
+    brighter = cv2.add(face, 20)
+    resized = cv2.resize(face, (150, 180))
+
+    assert crop_fingerprint(face).shape == (16, 16)
+    assert np.mean(np.abs(crop_fingerprint(face) - crop_fingerprint(brighter))) < 1.0
+    assert np.mean(np.abs(crop_fingerprint(face) - crop_fingerprint(resized))) < 3.0
+    assert np.mean(np.abs(crop_fingerprint(face) - crop_fingerprint(_face(1)))) > 6.0
+
+
+def test_result_is_reused_until_ttl_or_crop_change():
+    cache = TrackResultCache(max_diff=6.0, ttl=1.0)
+    fingerprint = crop_fingerprint(_face(0))
+    cache.store(7, fingerprint, {'person_id': 1, 'similarity': 90.0}, now=10.0)
+
+    hit = cache.lookup(7, fingerprint, now=10.5)
+    assert hit == {'person_id': 1, 'similarity': 90.0}
+    hit['person_id'] = 2  # Результат выдается копией
+    assert cache.lookup(7, fingerprint, now=11.0)['person_id'] == 1
+
+    assert cache.lookup(7, fingerprint, now=11.01) is None  # Истек TTL
+    assert cache.lookup(7, crop_fingerprint(_face(1)), now=10.5) is None  # Другое лицо
+    assert cache.lookup(8, fingerprint, now=10.5) is None  # Другой трек
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_prune_drops_expired_tracks():
+    cache = TrackResultCache(ttl=1.0)
+    fingerprint = crop_fingerprint(_face(0))
+    cache.store(1, fingerprint, {}, now=10.0)
+    cache.store(2, fingerprint, {}, now=10.8)
+
+    cache.prune(now=11.5)
+    assert list(cache.entries) == [2]
+
+
+def test_sync_clears_results_of_previous_gallery_version():
+    cache = TrackResultCache()
+    fingerprint = crop_fingerprint(_face(0))
+    cache.sync(1)
+    cache.store(7, fingerprint, {'person_id': 1}, now=10.0)
+
+    cache.sync(1)
+    assert cache.lookup(7, fingerprint, now=10.1) is not None
+    cache.sync(2)
+    assert cache.lookup(7, fingerprint, now=10.1) is None
+
+
+def test_tracked_faces_are_recognized_again_after_gallery_change(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    import recognition_service
+    from recognition import FaceRecognizer
+
+    recognizer = FaceRecognizer()
+    monkeypatch.setattr(recognition_service, "face_recognizer", recognizer)
+    faces = [_face(0, (200, 200)), _face(1, (200, 200))]
+    recognizer.add_faces(1, [faces[0]], "Иван Петров")
+    recognizer.add_faces(2, [faces[1]], "Анна Иванова")
+
+    cache = recognition_service.create_track_result_cache()
+    first = recognition_service._predict_tracked_faces([(7, faces[0])], cache)
+    assert first[0]['person_id'] == 1
+    recognition_service._predict_tracked_faces([(7, faces[0])], cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Человек удален: кэшированный результат трека больше не выдается
+    recognizer.remove_person(1)
+    after = recognition_service._predict_tracked_faces([(7, faces[0])], cache)
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert after[0]['person_id'] == 2
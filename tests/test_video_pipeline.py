@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+
+pytest.importorskip("PyQt5")
+
+from video_pipeline import LatestFrameQueue, RateController  # noqa: E402
+
+
+def test_queue_keeps_only_latest_frames():
+    frames = LatestFrameQueue(maxsize=2)
+    for frame in range(5):
+        frames.put(frame)
+
+    assert frames.dropped == 3
+    assert frames.get(timeout=0) == 3
+    assert frames.get(timeout=0) == 4
+    assert frames.get(timeout=0) is None
+
+
+def test_queue_get_waits_for_frame_from_other_thread():
+    frames = LatestFrameQueue()
+    timer = threading.Timer(0.05, frames.put, args=("frame",))
+    timer.start()
+    try:
+        assert frames.get(timeout=2) == "frame"
+    finally:
+        timer.cancel()
+
+
+def test_queue_clear():
+    frames = LatestFrameQueue(maxsize=3)
+    frames.put(1)
+    frames.put(2)
+    frames.clear()
+    assert frames.get(timeout=0) is None
+    assert frames.dropped == 0
+
+
+def test_rate_follows_measured_latency_within_limits():
+    rate = RateController(min_hz=5, max_hz=10, cpu_budget=0.5, smoothing=0.5)
+
+    # Быстрая обработка: частота упирается в max_hz
+    rate.record("detection", 0.01)
+    assert rate.interval == pytest.approx(0.1)
+
+    # 60 + 60 мс работы при бюджете 50% - интервал 240 мс, но не реже min_hz
+    rate.record("detection", 0.11)
+    rate.record("recognition", 0.06)
+    assert rate.latency["detection"] == pytest.approx(0.06)
+    assert rate.interval == pytest.approx(0.2)
+
+    rate.record("recognition", 0.0)
+    rate.record("detection", 0.02)
+    assert rate.interval == pytest.approx((0.04 + 0.03) / 0.5)
+    assert rate.rate == pytest.approx(1 / rate.interval)
+
+
+def test_rate_schedules_next_cycle():
+    rate = RateController(min_hz=5, max_hz=10)
+    assert rate.time_until_next(now=100.0) == 0.0
+
+    rate.start_cycle(now=100.0)
+    assert rate.time_until_next(now=100.04) == pytest.approx(0.06)
+    assert rate.time_until_next(now=100.2) == 0.0
+
+
+def test_measure_records_stage_even_on_error():
+    rate = RateController()
+    with pytest.raises(RuntimeError):
+        with rate.measure("recognition"):
+            raise RuntimeError
+    assert "recognition" in rate.latency
+    assert set(rate.stats()) == {"recognition", "rate_hz"}
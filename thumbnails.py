@@ -0,0 +1,165 @@
+"""
+Миниатюры фотографий для просмотра базы.
+
+Миниатюра (JPEG, сторона до THUMBNAIL_SIZE) создается при добавлении фото
+и хранится в таблице thumbnails; для фото, добавленных раньше, она создается
+при первом обращении. Чтение и масштабирование миниатюр идет в фоновом
+потоке ThumbnailLoader, а готовые QPixmap хранятся в LRU-кэше PixmapCache,
+поэтому прокрутка ленты фото не декодирует изображения в GUI-потоке.
+"""
+import queue
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtGui import QImage
+
+from database import (add_listener, close_thread_connection, get_photo, get_thumbnail, save_thumbnail,
+                      save_thumbnails)
+
+THUMBNAIL_SIZE = 320  # Наибольшая сторона хранимой миниатюры (хватает и для просмотра)
+THUMBNAIL_QUALITY = 85  # Качество JPEG миниатюры
+PIXMAP_CACHE_SIZE = 256  # Сколько готовых QPixmap держать в памяти
+
+
+def make_thumbnail(image_bytes, size=THUMBNAIL_SIZE):
+    """Создает миниатюру JPEG из байтов фото, возвращает байты или None"""
+    img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        return None
+
+    h, w = img.shape[:2]
+    scale = size / max(h, w)
+    if scale < 1:
+        img = cv2.resize(img, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+
+    success, buffer = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, THUMBNAIL_QUALITY])
+    return buffer.tobytes() if success else None
+
+
+def load_thumbnail(photo_id):
+    """Возвращает байты миниатюры, создавая ее для старых фото при первом обращении"""
+    thumbnail = get_thumbnail(photo_id)
+    if thumbnail is not None:
+        return thumbnail
+
+    image_bytes = get_photo(photo_id)
+    if image_bytes is None:
+        return None
+
+    thumbnail = make_thumbnail(image_bytes)
+    if thumbnail is not None:
+        save_thumbnail(photo_id, thumbnail)
+    return thumbnail
+
+
+def _on_database_change(event, **data):
+    """Создает миниатюру сразу при добавлении фото"""
+    if event == "photo_added":
+        thumbnail = make_thumbnail(data['image_bytes'])
+        if thumbnail is not None:
+            save_thumbnail(data['photo_id'], thumbnail)
+    elif event == "photos_added":
+        thumbnails = [(photo_id, make_thumbnail(image)) for photo_id, image in zip(data['photo_ids'], data['images'])]
+        save_thumbnails([(photo_id, thumbnail) for photo_id, thumbnail in thumbnails if thumbnail is not None])
+
+
+add_listener(_on_database_change)
+
+
+class PixmapCache:
+    """LRU-кэш QPixmap по ключу (photo_id, размер). Используется только из GUI-потока"""
+
+    def __init__(self, capacity=PIXMAP_CACHE_SIZE):
+        self.capacity = capacity
+        self._items = OrderedDict()
+
+    def get(self, key):
+        pixmap = self._items.get(key)
+        if pixmap is not None:
+            self._items.move_to_end(key)
+        return pixmap
+
+    def put(self, key, pixmap):
+        self._items[key] = pixmap
+        self._items.move_to_end(key)
+        while len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+
+    def discard_photo(self, photo_id):
+        """Убирает из кэша все размеры фото"""
+        for key in [key for key in self._items if key[0] == photo_id]:
+            del self._items[key]
+
+
+class ThumbnailLoader(QThread):
+    """
+    Фоновая загрузка миниатюр: чтение из базы, декодирование и масштабирование.
+    QPixmap создается только в GUI-потоке, поэтому поток отдает QImage.
+    """
+
+    thumbnail_ready = pyqtSignal(int, int, QImage)  # photo_id, размер, изображение
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._requests = queue.LifoQueue()  # Последние запросы (видимые сейчас) - первыми
+        self._pending = set()
+        self._running = False
+
+    def request(self, photo_id, size):
+        """Ставит миниатюру в очередь загрузки (повторные запросы игнорируются)"""
+        key = (photo_id, size)
+        if key in self._pending:
+            return
+        self._pending.add(key)
+        self._requests.put(key)
+
+    def cancel_all(self):
+        """Отменяет еще не выполненные запросы (например, при выборе другого человека)"""
+        while True:
+            try:
+                self._pending.discard(self._requests.get_nowait())
+            except queue.Empty:
+                break
+
+    def run(self):
+        self._running = True
+        try:
+            while self._running:
+                try:
+                    key = self._requests.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if key is None:
+                    break
+
+                photo_id, size = key
+                try:
+                    image = self._load(photo_id, size)
+                    if image is not None:
+                        self.thumbnail_ready.emit(photo_id, size, image)
+                except Exception as e:
+                    print(f"Ошибка загрузки миниатюры {photo_id}: {e}")
+                finally:
+                    self._pending.discard(key)
+        finally:
+            close_thread_connection()
+
+    def _load(self, photo_id, size):
+        thumbnail = load_thumbnail(photo_id)
+        if thumbnail is None:
+            return None
+
+        image = QImage.fromData(thumbnail, "JPG")
+        if image.isNull():
+            return None
+        if max(image.width(), image.height()) > size:
+            image = image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        return image
+
+    def stop(self):
+        """Останавливает поток и дожидается его завершения"""
+        self._running = False
+        self._requests.put(None)
+        self.wait()
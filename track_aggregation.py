@@ -0,0 +1,120 @@
+"""
+Накопление результатов распознавания по трекам лиц.
+
+Каждое лицо видеопотока ведется трекером под постоянным ID. Вместо решения
+по отдельному кадру результаты трека голосуют в скользящем окне: человек
+считается распознанным, когда за него отдана заметная доля голосов окна,
+а сходство усредняется по этим кадрам. Это убирает мерцание результата около
+порога и позволяет записывать в журнал одно событие на трек, а не на кадр.
+"""
+import time
+from collections import Counter, deque
+
+TRACK_WINDOW = 15  # Кадров в скользящем окне голосования
+TRACK_MIN_FRAMES = 5  # До стольких кадров решение по треку не принимается
+TRACK_VOTE_RATIO = 0.6  # Доля голосов окна, нужная для распознавания
+TRACK_EXPIRE_SECONDS = 1.0  # Трек, не встречавшийся столько секунд, завершается
+
+
+class TrackAggregator:
+    """
+    Голосование по трекам и события распознавания
+
+    Args:
+        threshold: порог сходства (в процентах) для голоса за человека
+        on_event: callback(person_id, similarity, result) - одно событие на трек:
+            "SUCCESS" при распознавании человека (и при смене человека в треке),
+            "FAILED" при завершении трека, в котором никто не был распознан
+    """
+
+    def __init__(self, threshold, on_event=None, window=TRACK_WINDOW, min_frames=TRACK_MIN_FRAMES,
+                 vote_ratio=TRACK_VOTE_RATIO, expire_seconds=TRACK_EXPIRE_SECONDS):
+        self.threshold = threshold
+        self.on_event = on_event
+        self.window = window
+        self.min_frames = min_frames
+        self.vote_ratio = vote_ratio
+        self.expire_seconds = expire_seconds
+        self.tracks = {}  # track_id -> состояние трека
+
+    def update(self, observations, now=None):
+        """
+        Добавляет результаты очередного кадра
+
+        Args:
+            observations: [(track_id, person_id, similarity)] - результаты кадра по трекам
+
+        Returns:
+            list: [{'person_id', 'similarity', 'recognized'}] - решения по трекам в порядке входа
+        """
+        now = time.monotonic() if now is None else now
+        decisions = []
+
+        for track_id, person_id, similarity in observations:
+            state = self.tracks.get(track_id)
+            if state is None:
+                state = self.tracks[track_id] = {
+                    'history': deque(maxlen=self.window),
+                    'frames': 0,
+                    'person_id': None,
+                    'logged_person': None,
+                    'best_similarity': 0.0,
+                }
+
+            vote = person_id if person_id is not None and similarity >= self.threshold else None
+            state['history'].append((vote, similarity))
+            state['frames'] += 1
+            state['last_seen'] = now
+            state['best_similarity'] = max(state['best_similarity'], similarity)
+
+            decisions.append(self._decide(state))
+
+        # Завершаем треки, которые давно не встречались
+        for track_id in [tid for tid, state in self.tracks.items()
+                         if now - state['last_seen'] > self.expire_seconds]:
+            self._finish(self.tracks.pop(track_id))
+
+        return decisions
+
+    def flush(self):
+        """Завершает все треки (например, при остановке камеры)"""
+        tracks, self.tracks = self.tracks, {}
+        for state in tracks.values():
+            self._finish(state)
+
+    def _decide(self, state):
+        history = state['history']
+        votes = Counter(vote for vote, _ in history if vote is not None)
+
+        person_id = None
+        if state['frames'] >= self.min_frames and votes:
+            leader, count = votes.most_common(1)[0]
+            current = state['person_id']
+            if count >= self.vote_ratio * len(history):
+                person_id = leader
+            elif current is not None and votes[current] >= (1 - self.vote_ratio) * len(history):
+                # Гистерезис: уже принятое решение держится, пока за него достаточно голосов
+                person_id = current
+        state['person_id'] = person_id
+
+        if person_id is not None:
+            similarity = sum(s for vote, s in history if vote == person_id) / votes[person_id]
+            if person_id != state['logged_person']:
+                state['logged_person'] = person_id
+                self._emit(person_id, similarity, "SUCCESS")
+        else:
+            similarity = sum(s for _, s in history) / len(history)
+
+        return {'person_id': person_id, 'similarity': similarity, 'recognized': person_id is not None}
+
+    def _finish(self, state):
+        # Короткие треки (ложные срабатывания детектора) в журнал не попадают
+        if state['logged_person'] is None and state['frames'] >= self.min_frames:
+            self._emit(None, state['best_similarity'], "FAILED")
+
+    def _emit(self, person_id, similarity, result):
+        if self.on_event:
+            try:
+                self.on_event(person_id, similarity, result)
+            except Exception as e:
+                print(f"Ошибка обработчика события трека: {e}")
@@ -0,0 +1,79 @@
+"""
+Кэш результатов распознавания по трекам лиц.
+
+Пока человек стоит неподвижно, кроп его лица почти не меняется от кадра
+к кадру, и полный проход (препроцессинг, LBPH-гистограмма, поиск по галерее)
+дает тот же результат. Для каждого трека хранится отпечаток кропа, по которому
+распознавание выполнялось в последний раз: уменьшенное до FINGERPRINT_SIZE
+изображение без средней яркости. Если среднее абсолютное отличие нового
+отпечатка от сохраненного меньше RESULT_CACHE_MAX_DIFF и с момента
+распознавания прошло не больше RESULT_CACHE_TTL секунд, результат берется
+из кэша. Сравнение всегда идет с кропом последнего распознавания, поэтому
+медленные изменения не накапливаются незамеченными. При любом изменении
+галереи (обучение, добавление фото, удаление человека) кэш сбрасывается.
+"""
+import time
+
+import cv2
+import numpy as np
+
+FINGERPRINT_SIZE = (16, 16)  # Размер уменьшенного кропа для сравнения
+RESULT_CACHE_MAX_DIFF = 6.0  # Наибольшее среднее отличие отпечатков (яркость 0-255)
+RESULT_CACHE_TTL = 1.0  # Через столько секунд трек распознается заново в любом случае
+
+
+def crop_fingerprint(face_image, size=FINGERPRINT_SIZE):
+    """Отпечаток кропа лица: уменьшенное изображение float32 без средней яркости"""
+    if face_image.ndim == 3:
+        face_image = cv2.cvtColor(face_image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(face_image, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+    small -= small.mean()
+    return small
+
+
+class TrackResultCache:
+    """Последний результат распознавания каждого трека. Используется из одного потока"""
+
+    def __init__(self, max_diff=RESULT_CACHE_MAX_DIFF, ttl=RESULT_CACHE_TTL):
+        self.max_diff = max_diff
+        self.ttl = ttl
+        self.entries = {}  # track_id -> (отпечаток, результат, время распознавания)
+        self.generation = None  # Версия галереи, по которой получены результаты
+        self.hits = 0
+        self.misses = 0
+
+    def sync(self, generation):
+        """Сбрасывает кэш, если галерея изменилась с момента сохранения результатов"""
+        if generation != self.generation:
+            self.entries.clear()
+            self.generation = generation
+
+    def lookup(self, track_id, fingerprint, now=None):
+        """Возвращает копию сохраненного результата или None, если трек нужно распознать"""
+        now = time.monotonic() if now is None else now
+        entry = self.entries.get(track_id)
+        if entry is not None:
+            stored_fingerprint, result, stored_at = entry
+            if now - stored_at <= self.ttl and \
+                    float(np.mean(np.abs(stored_fingerprint - fingerprint))) <= self.max_diff:
+                self.hits += 1
+                return dict(result)
+
+        self.misses += 1
+        return None
+
+    def store(self, track_id, fingerprint, result, now=None):
+        """Сохраняет результат распознавания трека"""
+        now = time.monotonic() if now is None else now
+        self.entries[track_id] = (fingerprint, dict(result), now)
+
+    def prune(self, now=None):
+        """Удаляет записи, которые больше не могут быть использованы (в т.ч. завершенных треков)"""
+        now = time.monotonic() if now is None else now
+        for track_id in [tid for tid, (_, _, stored_at) in self.entries.items()
+                         if now - stored_at > self.ttl]:
+            del self.entries[track_id]
+
+    def clear(self):
+        """Сбрасывает кэш (например, после переобучения модели)"""
+        self.entries.clear()
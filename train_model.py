@@ -9,8 +9,9 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 
-from database import init_db, get_all_photos, get_all_persons
+from database import init_db, iter_photos, count_photos, get_all_persons
 from recognition import face_recognizer
+from recognition_service import retrain_model
 
 
 def train_model():
@@ -23,42 +24,39 @@ def train_model():
     init_db()
 
     # Получаем данные из базы
-    all_photos = get_all_photos()
+    photo_count = count_photos()
     all_persons = get_all_persons()
 
     print(f"Найдено в базе:")
     print(f"  - Людей: {len(all_persons)}")
-    print(f"  - Фотографий: {len(all_photos)}")
+    print(f"  - Фотографий: {photo_count}")
 
-    if not all_photos:
+    if not photo_count:
         print("ОШИБКА: В базе нет фотографий для обучения!")
         print("Добавьте людей через интерфейс сначала.")
         return False
 
     # Обучаем модель
     print("\nНачинаю обучение модели LBPH...")
-    success = face_recognizer.train(all_photos, all_persons)
+    success = retrain_model()
 
     if success:
         print(f"\n✅ МОДЕЛЬ УСПЕШНО ОБУЧЕНА!")
         print(f"   Обучено на {len(face_recognizer.labels)} уникальных лицах")
 
-        # Сохраняем модель
-        face_recognizer.save_model()
-
         # Тестируем модель
         print("\nТестирование модели:")
         print(f"Статус модели: {'Обучена' if face_recognizer.is_trained else 'Не обучена'}")
         print(f"Количество лиц: {len(face_recognizer.labels)}")
 
         # Тестируем сравнение лиц
-        if all_photos:
+        if photo_count:
             try:
                 import cv2
                 import numpy as np
 
                 # Берем первое фото для теста
-                person_id, blob = all_photos[0]
+                person_id, blob = next(iter_photos(limit=1))
                 test_face = cv2.imdecode(np.frombuffer(blob, np.uint8), cv2.IMREAD_GRAYSCALE)
 
                 # Тестируем предсказание
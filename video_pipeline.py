@@ -0,0 +1,205 @@
+"""
+Фоновый конвейер видеопотока: распознавание вне GUI-потока.
+
+Сервис камеры (camera_manager) раздает кадры через сигнал (для отображения)
+и через ограниченные очереди (для обработки). Поток распознавания берет из своей
+очереди только самый свежий кадр, поэтому медленное распознавание не тормозит
+отображение видео.
+
+Частоту распознавания задает RateController: он измеряет время этапов
+(детекция, распознавание, запрос данных) и выбирает интервал между запусками
+так, чтобы поток занимал не больше CPU_BUDGET времени, но работал не реже
+RECOGNITION_MIN_HZ и не чаще RECOGNITION_MAX_HZ. Кадры, пришедшие между
+запусками, вытесняются из очереди, а не накапливаются.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+RECOGNITION_MIN_HZ = 5  # Не реже стольких запусков распознавания в секунду
+RECOGNITION_MAX_HZ = 10  # Не чаще (независимо от частоты камеры и отображения)
+CPU_BUDGET = 0.5  # Доля времени, которую поток распознавания может быть занят
+LATENCY_SMOOTHING = 0.2  # Коэффициент скользящего среднего времени этапов
+
+
+class LatestFrameQueue:
+    """Ограниченная очередь кадров: при переполнении старые кадры вытесняются новыми"""
+
+    def __init__(self, maxsize=1):
+        self.maxsize = maxsize
+        self.dropped = 0  # Сколько кадров было вытеснено без обработки
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        """Кладет кадр в очередь, вытесняя самый старый при переполнении"""
+        with self._cond:
+            if len(self._items) == self.maxsize:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Возвращает кадр или None, если за timeout ничего не пришло"""
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def clear(self):
+        """Очищает очередь"""
+        with self._cond:
+            self._items.clear()
+
+
+class RateController:
+    """
+    Адаптивная частота обработки кадров по измеренному времени этапов
+
+    Интервал между запусками = (среднее время цикла) / cpu_budget, ограниченный
+    диапазоном [1 / max_hz, 1 / min_hz]. Используется из одного потока.
+    """
+
+    def __init__(self, min_hz=RECOGNITION_MIN_HZ, max_hz=RECOGNITION_MAX_HZ,
+                 cpu_budget=CPU_BUDGET, smoothing=LATENCY_SMOOTHING):
+        self.min_hz = min_hz
+        self.max_hz = max_hz
+        self.cpu_budget = cpu_budget
+        self.smoothing = smoothing
+        self.latency = {}  # этап -> среднее время, секунды
+        self._next_start = 0.0
+
+    @contextmanager
+    def measure(self, stage):
+        """Замеряет время этапа: with rate.measure("detection"): ..."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def record(self, stage, seconds):
+        """Добавляет замер времени этапа в скользящее среднее"""
+        previous = self.latency.get(stage)
+        if previous is None:
+            self.latency[stage] = seconds
+        else:
+            self.latency[stage] = previous + self.smoothing * (seconds - previous)
+
+    @property
+    def interval(self):
+        """Текущий интервал между запусками обработки, секунды"""
+        busy = sum(self.latency.values())
+        interval = busy / self.cpu_budget if self.cpu_budget > 0 else 0.0
+        return min(max(interval, 1.0 / self.max_hz), 1.0 / self.min_hz)
+
+    @property
+    def rate(self):
+        """Текущая частота обработки, Гц"""
+        return 1.0 / self.interval
+
+    def time_until_next(self, now=None):
+        """Сколько секунд осталось до следующего разрешенного запуска"""
+        now = time.monotonic() if now is None else now
+        return max(0.0, self._next_start - now)
+
+    def start_cycle(self, now=None):
+        """Отмечает начало обработки кадра"""
+        now = time.monotonic() if now is None else now
+        self._next_start = now + self.interval
+
+    def stats(self):
+        """Время этапов (мс) и частота обработки для диагностики"""
+        stats = {stage: seconds * 1000 for stage, seconds in self.latency.items()}
+        stats['rate_hz'] = self.rate
+        return stats
+
+
+class RecognitionWorker(QThread):
+    """
+    Поток распознавания: детекция всех лиц кадра, пакетное распознавание,
+    голосование по трекам и запрос данных о людях
+    """
+
+    result_ready = pyqtSignal(object)  # Сигнал с результатом распознавания (dict)
+
+    def __init__(self, frame_queue, rate=None, parent=None):
+        super().__init__(parent)
+        self.frame_queue = frame_queue
+        self.rate = rate or RateController()
+        self._running = False
+
+    def run(self):
+        # Импортируем здесь, чтобы модуль можно было подключать без модели
+        from image_utils import FaceTracker
+        from recognition_service import (recognize_tracked_faces, create_track_aggregator,
+                                         create_track_result_cache)
+        from database import get_person_by_id
+
+        # Каскад запускается раз в несколько кадров, между ними лица ведет трекер,
+        # а результаты по каждому треку накапливаются для устойчивого решения.
+        # Неподвижные лица повторно не распознаются, пока кроп почти не меняется
+        tracker = FaceTracker()
+        aggregator = create_track_aggregator()
+        result_cache = create_track_result_cache()
+
+        rate = self.rate
+        self._running = True
+        while self._running:
+            # Ждем своей очереди по частоте; кадры за это время вытесняют друг друга
+            delay = rate.time_until_next()
+            if delay > 0:
+                self.msleep(max(1, int(min(delay, 0.1) * 1000)))
+                continue
+
+            frame = self.frame_queue.get(timeout=0.1)
+            if frame is None:
+                # Кадров нет - завершаем треки, которые давно не видны
+                aggregator.update([])
+                continue
+
+            rate.start_cycle()
+            try:
+                with rate.measure("detection"):
+                    tracked = tracker.extract_all(frame)
+                with rate.measure("recognition"):
+                    results = recognize_tracked_faces([(track_id, face) for track_id, face, _ in tracked],
+                                                      aggregator, result_cache)
+
+                faces = []
+                with rate.measure("lookup"):
+                    for (track_id, _, box), result in zip(tracked, results):
+                        person = None
+                        if result['recognized'] and result['person_id'] is not None:
+                            person = get_person_by_id(result['person_id'])
+
+                        faces.append({
+                            'track_id': track_id,
+                            'box': box,
+                            'person': person,
+                            'similarity': result['similarity']
+                        })
+
+                # Для информационной панели выбираем лицо с наибольшим сходством
+                best = max(faces, key=lambda f: f['similarity'], default=None)
+                self.result_ready.emit({
+                    'faces': faces,
+                    'person': best['person'] if best else None,
+                    'similarity': best['similarity'] if best else 0,
+                    'stats': rate.stats()
+                })
+            except Exception as e:
+                print(f"Ошибка потока распознавания: {e}")
+
+        # Записываем события незавершенных треков
+        aggregator.flush()
+
+    def stop(self):
+        """Останавливает поток и дожидается его завершения"""
+        self._running = False
+        self.wait()
@@ -0,0 +1,106 @@
+"""
+Виджет отображения видеопотока.
+
+Кадр BGR масштабируется с сохранением пропорций (уменьшение - cv2.INTER_AREA,
+увеличение - cv2.INTER_LINEAR) сразу в заранее выделенный буфер размером с виджет и рисуется напрямую через QPainter как QImage
+формата BGR888, без перевода в RGB, QPixmap и сглаживающего масштабирования
+Qt. Пока виджет скрыт, кадры не обрабатываются вовсе.
+"""
+import cv2
+import numpy as np
+from PyQt5.QtCore import QPoint
+from PyQt5.QtGui import QImage, QPainter
+from PyQt5.QtWidgets import QLabel
+
+# Format_BGR888 появился в Qt 5.14; в старых версиях цвет переводится в свой буфер
+_BGR888 = getattr(QImage, "Format_BGR888", None)
+
+
+class VideoWidget(QLabel):
+    """
+    QLabel, показывающий кадры камеры. Текст и стили QLabel работают как обычно,
+    пока кадров нет (например, "Камера не запущена").
+
+    Атрибут overlay - необязательная функция overlay(painter, scale) для рисования
+    поверх кадра (рамки лиц и т.п.): painter смещен к левому верхнему углу кадра,
+    scale - отношение размера кадра на экране к исходному.
+    """
+
+    def __init__(self, text="", parent=None):
+        super().__init__(text, parent)
+        self.overlay = None
+        self._image = None
+        self._buffer = None  # Кадр на экране (BGR, или RGB для старых Qt); QImage ссылается на него
+        self._scaled_src = None  # Промежуточный буфер BGR для старых Qt
+        self._frame_size = None
+        self._target = None  # (ширина, высота) кадра на экране
+        self._offset = QPoint(0, 0)
+        self._scale = 1.0
+
+    def set_frame(self, frame):
+        """Показывает кадр BGR (uint8, HxWx3). Кадр не изменяется и не копируется целиком"""
+        if not self.isVisible():
+            return
+
+        h, w = frame.shape[:2]
+        if self._frame_size != (w, h) or self._target is None:
+            self._frame_size = (w, h)
+            self._update_geometry()
+
+        tw, th = self._target
+        scaled = self._buffer if _BGR888 is not None else self._scaled_src
+        if (tw, th) == (w, h):
+            np.copyto(scaled, frame)
+        else:
+            interpolation = cv2.INTER_AREA if self._scale < 1.0 else cv2.INTER_LINEAR
+            cv2.resize(frame, (tw, th), dst=scaled, interpolation=interpolation)
+
+        if _BGR888 is None:
+            cv2.cvtColor(scaled, cv2.COLOR_BGR2RGB, dst=self._buffer)
+            fmt = QImage.Format_RGB888
+        else:
+            fmt = _BGR888
+
+        # QImage ссылается на буфер, который живет до смены размеров
+        self._image = QImage(self._buffer.data, tw, th, self._buffer.strides[0], fmt)
+
+        if self.text():
+            self.setText("")
+        self.update()
+
+    def clear_frame(self, text=""):
+        """Убирает кадр и показывает текст"""
+        self._image = None
+        self.setText(text)
+        self.update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self._frame_size is not None:
+            self._update_geometry()
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self._image is None:
+            return
+
+        painter = QPainter(self)
+        painter.drawImage(self._offset, self._image)
+        if self.overlay:
+            painter.translate(self._offset)
+            self.overlay(painter, self._scale)
+        painter.end()
+
+    def _update_geometry(self):
+        """Пересчитывает размер кадра на экране и буферы (только при смене размеров)"""
+        w, h = self._frame_size
+        scale = min(self.width() / w, self.height() / h) if self.width() and self.height() else 1.0
+        tw, th = max(1, int(w * scale)), max(1, int(h * scale))
+
+        self._scale = tw / w
+        self._target = (tw, th)
+        self._offset = QPoint((self.width() - tw) // 2, (self.height() - th) // 2)
+        # QImage ссылается на память прежнего буфера: до следующего кадра рисовать нечего
+        self._image = None
+        self._buffer = np.empty((th, tw, 3), dtype=np.uint8)
+        self._scaled_src = np.empty((th, tw, 3), dtype=np.uint8) if _BGR888 is None else None